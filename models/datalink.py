@@ -1,4 +1,5 @@
 import os
+from collections import defaultdict
 
 def create_symlink(source, link_name):
     try:
@@ -9,6 +10,49 @@ def create_symlink(source, link_name):
     except OSError as e:
         print(f"Failed to create symbolic link: {e}")
 
+def create_symlinks(pairs, quiet=False):
+    """Create many symbolic links, opening each link directory once.
+
+    Args:
+        pairs: Iterable of (source, link_name) tuples
+        quiet: Only report failures and a final summary instead of one line per link
+
+    Returns:
+        Number of links created
+    """
+    # Group link names by parent directory so each directory is resolved once
+    by_dir = defaultdict(list)
+    for source, link_name in pairs:
+        by_dir[os.path.dirname(link_name) or '.'].append((source, link_name))
+
+    use_dir_fd = os.symlink in os.supports_dir_fd
+    created = 0
+    for directory, items in by_dir.items():
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)) if use_dir_fd else None
+        except OSError as e:
+            print(f"Failed to open link directory '{directory}': {e}")
+            continue
+        try:
+            for source, link_name in items:
+                try:
+                    if dir_fd is None:
+                        os.symlink(source, link_name)
+                    else:
+                        os.symlink(source, os.path.basename(link_name), dir_fd=dir_fd)
+                    created += 1
+                    if not quiet:
+                        print(f"Symbolic link created: {link_name} -> {source}")
+                except OSError as e:
+                    print(f"Failed to create symbolic link: {e}")
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+    if quiet:
+        print(f"Symbolic links created: {created}")
+    return created
+
 if __name__ == "__main__":
     source_path = input("Enter the source path: ")
     link_name = input("Enter the symbolic link name: ")
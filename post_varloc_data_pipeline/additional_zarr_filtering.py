@@ -22,49 +22,116 @@ Configuration:
 """
 
 import argparse
+import json
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 import xarray as xr
+import zarr
 import warnings
 from pathlib import Path
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 
 # Add parent directory to path to access the config module
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from post_varloc_data_pipeline.config import parse_yaml
+from post_varloc_data_pipeline import filter_kernel
+from post_varloc_data_pipeline.config import initialize_config, parse_yaml
+from post_varloc_data_pipeline.tsv_utils import write_tsv
+from post_varloc_data_pipeline.zarr_utils import dataset_to_dataframe, get_directory_size, write_dataframe_to_zarr, write_dataset_to_zarr
 
 # Suppress Zarr warnings
 warnings.filterwarnings('ignore', message='.*vlen-utf8.*')
 warnings.filterwarnings('ignore', message='.*StringDType.*')
 warnings.filterwarnings('ignore', message='.*Consolidated metadata.*')
 
+# If numba is installed, JIT-compile the BED interval overlap check.
+# The kernel releases the GIL instead of using numba's own parallel layer: filter_dataset
+# already calls it once per Zarr chunk from its thread pool.
+try:
+    from numba import njit
+
+    @njit(nogil=True, cache=True)
+    def _bed_mask_kernel(pos, chrom_codes, offsets, starts_flat, ends_cummax_flat):
+        """Mark positions inside any BED region using per-chromosome slices of the flat index."""
+        mask = np.zeros(len(pos), dtype=np.bool_)
+        for i in range(len(pos)):
+            c = chrom_codes[i]
+            if c < 0 or np.isnan(pos[i]):
+                continue
+            lo = offsets[c]
+            hi = offsets[c + 1]
+            j = np.searchsorted(starts_flat[lo:hi], pos[i], side='right') - 1
+            mask[i] = j >= 0 and pos[i] <= ends_cummax_flat[lo + j]
+        return mask
+
+    NUMBA_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMBA_AVAILABLE = False
+
+# Read Excel gene filter files with the Rust calamine parser when python-calamine is
+# installed; otherwise pandas falls back to its default engine (openpyxl)
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ModuleNotFoundError:
+    EXCEL_ENGINE = None
+
 
 class AdditionalZarrFilter:
     """Apply gene filtering to Zarr files with same logic as zarr_pivot_creator.py"""
 
-    def __init__(self, config_file=None):
-        """Initialize with configuration file (uses config.yaml by default)."""
+    # Variables read to build the gene, rsID, and BED region filter masks
+    FILTER_COLUMNS = ('CHROM', 'POS', "ANN['SYMBOL']", 'ID')
+
+    def __init__(self, config_file=None, verbose=True):
+        """
+        Initialize with configuration file (uses config.yaml by default).
+
+        Args:
+            config_file: Path to YAML configuration file
+            verbose: Whether to print example kept/filtered rows during BED filtering
+        """
         self.config_file = config_file or "config.yaml"
         self.config = None
+        self.verbose = verbose
         self.gene_filter_symbols = None
         self.gene_filter_rsids = None
-        self.bed_regions = None
+        # BED regions as parallel arrays (chr, start, stop)
+        self.bed_chrom = None
+        self.bed_start = None
+        self.bed_end = None
+        self.bed_by_chrom = None
+        self.bed_flat_index = None
+        # Numba needle tables keyed by id() of the filter value array they were built from
+        self._needle_tables = {}
         self.load_config(self.config_file)
 
+    # Config-derived settings cached per instance; cleared whenever the config is reloaded
+    _CONFIG_CACHED_PROPERTIES = ('output_dir', 'gene_filter_file', 'bed_file', 'drop_columns')
+
     def load_config(self, config_file: str) -> None:
         """Load configuration from YAML file."""
+        for name in self._CONFIG_CACHED_PROPERTIES:
+            self.__dict__.pop(name, None)
         self.config = parse_yaml(config_file)
 
-    def get_output_dir_from_config(self):
-        """Get output directory from configuration."""
+    @cached_property
+    def output_dir(self):
+        """Output directory from configuration."""
         output_dir = "data/additional_filtering"  # default
         if 'ADDITIONAL_ZARR_FILTERING' in self.config and 'OUTPUT_DIR' in self.config['ADDITIONAL_ZARR_FILTERING']:
             output_dir = self.config['ADDITIONAL_ZARR_FILTERING']['OUTPUT_DIR']
         print(f"Using output directory: {output_dir}")
         return output_dir
 
-    def get_gene_filter_from_config(self):
-        """Get gene filter file path from configuration."""
+    @cached_property
+    def gene_filter_file(self):
+        """Gene filter file path from configuration."""
         gene_filter_file = None
         if 'ADDITIONAL_ZARR_FILTERING' in self.config and 'GENE_FILTER' in self.config['ADDITIONAL_ZARR_FILTERING']:
             gene_filter_file = self.config['ADDITIONAL_ZARR_FILTERING']['GENE_FILTER']
@@ -72,8 +139,9 @@ class AdditionalZarrFilter:
             print(f"Found gene filter in config: {gene_filter_file}")
         return gene_filter_file
 
-    def get_bed_file_from_config(self):
-        """Get BED file path from configuration."""
+    @cached_property
+    def bed_file(self):
+        """BED file path from configuration."""
         bed_file = None
         if 'ADDITIONAL_ZARR_FILTERING' in self.config and 'BED_FILE' in self.config['ADDITIONAL_ZARR_FILTERING']:
             bed_file = self.config['ADDITIONAL_ZARR_FILTERING']['BED_FILE']
@@ -81,8 +149,9 @@ class AdditionalZarrFilter:
             print(f"Found BED file in config: {bed_file}")
         return bed_file
 
-    def get_columns_to_drop(self):
-        """Get list of columns to drop from configuration."""
+    @cached_property
+    def drop_columns(self):
+        """List of columns to drop from configuration."""
         drop_columns = []
         if 'ADDITIONAL_ZARR_FILTERING' in self.config and 'DROP_COLUMNS' in self.config['ADDITIONAL_ZARR_FILTERING']:
             drop_config = self.config['ADDITIONAL_ZARR_FILTERING']['DROP_COLUMNS']
@@ -97,28 +166,57 @@ class AdditionalZarrFilter:
         drop_columns = list(set([col for col in drop_columns if col.strip()]))
         return drop_columns
 
-    def apply_column_dropping(self, df):
-        """Drop specified columns from DataFrame."""
-        drop_columns = self.get_columns_to_drop()
+    def get_output_dir_from_config(self):
+        """Get output directory from configuration (see output_dir)."""
+        return self.output_dir
+
+    def get_gene_filter_from_config(self):
+        """Get gene filter file path from configuration (see gene_filter_file)."""
+        return self.gene_filter_file
+
+    def get_bed_file_from_config(self):
+        """Get BED file path from configuration (see bed_file)."""
+        return self.bed_file
+
+    def get_columns_to_drop(self):
+        """Get list of columns to drop from configuration (see drop_columns)."""
+        return self.drop_columns
+
+    def apply_column_dropping(self, df, dropped_at_open=()):
+        """
+        Drop specified columns from a DataFrame or the matching variables from a Dataset.
+
+        Args:
+            df: DataFrame or Dataset to drop columns from
+            dropped_at_open: Configured columns already skipped with drop_variables when the
+                Zarr store was opened; they are reported as dropped
+        """
+        drop_columns = self.drop_columns
         if not drop_columns:
             print("No columns configured to drop")
             return df
+        dropped_at_open = set(dropped_at_open)
 
         print("\n🗑️  COLUMN DROPPING:")
         print(f"   Columns to drop from config: {drop_columns}")
 
-        # Only drop columns that actually exist in the DataFrame
-        columns_to_drop = [col for col in drop_columns if col in df.columns]
-        missing_drop_columns = [col for col in drop_columns if col not in df.columns]
+        # Only drop columns that actually exist in the data
+        is_dataset = isinstance(df, xr.Dataset)
+        available_columns = df.data_vars if is_dataset else df.columns
+        columns_to_drop = [col for col in drop_columns if col in available_columns]
+        missing_drop_columns = [col for col in drop_columns
+                                if col not in available_columns and col not in dropped_at_open]
 
         if missing_drop_columns:
             print(f"   Warning: Columns not found in data: {missing_drop_columns}")
 
-        if columns_to_drop:
-            original_column_count = len(df.columns)
-            df_dropped = df.drop(columns=columns_to_drop)
-            print(f"   ✓ Dropped {len(columns_to_drop)} columns: {columns_to_drop}")
-            print(f"   Columns remaining: {len(df_dropped.columns)} (was {original_column_count})")
+        if columns_to_drop or dropped_at_open:
+            original_column_count = len(available_columns) + len(dropped_at_open)
+            df_dropped = df.drop_vars(columns_to_drop) if is_dataset else df.drop(columns=columns_to_drop)
+            remaining_count = len(df_dropped.data_vars) if is_dataset else len(df_dropped.columns)
+            dropped = [col for col in drop_columns if col in dropped_at_open or col in columns_to_drop]
+            print(f"   ✓ Dropped {len(dropped)} columns: {dropped}")
+            print(f"   Columns remaining: {remaining_count} (was {original_column_count})")
             return df_dropped
         else:
             print("   No matching columns found to drop")
@@ -127,28 +225,66 @@ class AdditionalZarrFilter:
     def load_bed_file(self, bed_file):
         """Load genomic regions from BED file for filtering."""
         try:
-            # Read BED file
-            bed_df = pd.read_csv(bed_file, sep='\t', header=None)
+            # Read BED file with typed chr/start/stop columns (gzip detected from the magic bytes)
+            with open(bed_file, 'rb') as f:
+                is_gzip = f.read(2) == b'\x1f\x8b'
+            with pa.input_stream(str(bed_file), compression='gzip' if is_gzip else None) as source:
+                bed_table = pa_csv.read_csv(
+                    source,
+                    read_options=pa_csv.ReadOptions(autogenerate_column_names=True, use_threads=True),
+                    parse_options=pa_csv.ParseOptions(delimiter='\t'),
+                    convert_options=pa_csv.ConvertOptions(
+                        column_types={'f0': pa.string(), 'f1': pa.int64(), 'f2': pa.int64()}
+                    ),
+                )
 
             # Verify minimum 3 columns
-            if len(bed_df.columns) < 3:
+            if bed_table.num_columns < 3:
                 raise ValueError("BED file must have at least 3 columns (chr, start, stop)")
 
             # Process chromosome names to handle 'chr' prefix
-            bed_df[0] = bed_df[0].astype(str).str.lower().str.replace('chr', '')
-
-            # Convert coordinates to integers
-            bed_df[1] = bed_df[1].astype(int)
-            bed_df[2] = bed_df[2].astype(int)
-
-            # Store as list of tuples (chr, start, stop) - only first 3 columns
-            self.bed_regions = [(row[0], row[1], row[2]) for row in bed_df.itertuples(index=False, name=None)]
-            print(f"✓ Loaded {len(self.bed_regions)} regions from BED file")
+            chrom = pc.replace_substring(pc.utf8_lower(bed_table['f0']), 'chr', '')
+
+            # Store as parallel arrays (chr, start, stop) - only first 3 columns
+            self.bed_chrom = chrom.to_numpy(zero_copy_only=False)
+            self.bed_start = bed_table['f1'].to_numpy().astype(np.int64, copy=False)
+            self.bed_end = bed_table['f2'].to_numpy().astype(np.int64, copy=False)
+
+            # Order regions by (chromosome code, start) with one stable sort. Chromosome codes
+            # follow first appearance, and a BED file sorted that way skips the sort entirely.
+            chrom_codes, chrom_names = pd.factorize(self.bed_chrom)
+            has_chrom = chrom_codes >= 0
+            chrom_codes = chrom_codes[has_chrom]
+            starts_flat = self.bed_start[has_chrom]
+            ends_flat = self.bed_end[has_chrom]
+            same_chrom = chrom_codes[1:] == chrom_codes[:-1]
+            already_sorted = (np.all(chrom_codes[1:] >= chrom_codes[:-1])
+                              and np.all(~same_chrom | (starts_flat[1:] >= starts_flat[:-1])))
+            if not already_sorted:
+                order = np.lexsort((starts_flat, chrom_codes))
+                starts_flat = starts_flat[order]
+                ends_flat = ends_flat[order]
+
+            # Build per-chromosome interval index: sorted starts plus running max of ends
+            region_counts = np.bincount(chrom_codes, minlength=len(chrom_names))
+            offsets = np.concatenate([[0], np.cumsum(region_counts)]).astype(np.int64)
+            ends_cummax_flat = np.empty_like(ends_flat)
+            self.bed_by_chrom = {}
+            for code, chrom in enumerate(chrom_names):
+                start, end = offsets[code], offsets[code + 1]
+                ends_cummax_flat[start:end] = np.maximum.accumulate(ends_flat[start:end])
+                self.bed_by_chrom[chrom] = (starts_flat[start:end], ends_cummax_flat[start:end])
+
+            # Flattened copy of the index for the numba kernel, sliced by chromosome code
+            self.bed_flat_index = (offsets, starts_flat, ends_cummax_flat)
+
+            region_count = len(self.bed_start)
+            print(f"✓ Loaded {region_count} regions from BED file")
             print("  Example regions:")
-            for i, region in enumerate(self.bed_regions[:3]):
-                print(f"    Region {i+1}: Chr {region[0]}, {region[1]}-{region[2]}")
-            if len(self.bed_regions) > 3:
-                print(f"    ... and {len(self.bed_regions)-3} more regions")
+            for i, (chrom, start, end) in enumerate(zip(self.bed_chrom[:3], self.bed_start[:3], self.bed_end[:3])):
+                print(f"    Region {i+1}: Chr {chrom}, {start}-{end}")
+            if region_count > 3:
+                print(f"    ... and {region_count-3} more regions")
 
         except Exception as e:
             print(f"Error loading BED file '{bed_file}': {e}")
@@ -157,63 +293,64 @@ class AdditionalZarrFilter:
     def load_gene_filter(self, gene_filter_file):
         """Load gene symbols and rsIDs from TSV/CSV/Excel file for filtering."""
         try:
-            # Determine file type and read accordingly
+            # Determine file type and read only the header first
             file_ext = Path(gene_filter_file).suffix.lower()
+            is_excel = file_ext in ['.xlsx', '.xls']
+            sep = ',' if file_ext == '.csv' else '\t'  # Default to TSV
 
-            if file_ext in ['.xlsx', '.xls']:
-                # Read Excel file
-                gene_df = pd.read_excel(gene_filter_file)
-            elif file_ext == '.csv':
-                # Read CSV file
-                gene_df = pd.read_csv(gene_filter_file)
+            if is_excel:
+                # Open the workbook once and reuse it for the header and column reads
+                excel_file = pd.ExcelFile(gene_filter_file, engine=EXCEL_ENGINE)
+                available_columns = list(excel_file.parse(nrows=0).columns)
             else:
-                # Default to TSV
-                gene_df = pd.read_csv(gene_filter_file, sep='\t')
+                available_columns = list(pd.read_csv(gene_filter_file, sep=sep, nrows=0).columns)
 
-            print(f"Available columns in gene filter file: {list(gene_df.columns)}")
+            print(f"Available columns in gene filter file: {available_columns}")
 
-            # Initialize filter sets
-            self.gene_filter_symbols = set()
-            self.gene_filter_rsids = set()
+            # Map lowercased names to the original headers (first occurrence wins)
+            column_map = {}
+            for col in available_columns:
+                column_map.setdefault(str(col).lower(), col)
 
             # Check for Symbol column (could be 'Symbol', 'Gene Symbol', etc.)
-            symbol_column = None
-            for col in gene_df.columns:
-                if col.lower() in ['symbol', 'gene symbol', 'gene_symbol']:
-                    symbol_column = col
-                    break
+            symbol_column = next((column_map[name] for name in ('symbol', 'gene symbol', 'gene_symbol')
+                                  if name in column_map), None)
+
+            # Check for rsID column
+            rsid_column = next((column_map[name] for name in ('rsid', 'rs_id', 'rs id', 'rsid_paper')
+                                if name in column_map), None)
+
+            # Read only the filter columns
+            usecols = [col for col in (symbol_column, rsid_column) if col]
+            if not usecols:
+                gene_df = pd.DataFrame()
+            elif is_excel:
+                gene_df = excel_file.parse(usecols=usecols)
+            else:
+                gene_df = pd.read_csv(gene_filter_file, sep=sep, usecols=usecols,
+                                      engine='pyarrow', dtype_backend='pyarrow')
+
+            # Initialize filter value sets (Arrow string arrays used as is_in value sets)
+            self.gene_filter_symbols = pa.array([], type=pa.string())
+            self.gene_filter_rsids = pa.array([], type=pa.string())
 
             if symbol_column:
                 # Extract unique gene symbols and remove any null values
-                symbols = gene_df[symbol_column].dropna().unique()
-                self.gene_filter_symbols = set(symbols)
+                symbols = gene_df[symbol_column].dropna().astype('string[pyarrow]')
+                self.gene_filter_symbols = pa.array(pd.unique(symbols), type=pa.string())
                 print(f"✓ Loaded {len(self.gene_filter_symbols)} gene symbols for filtering")
-                print(f"  Example symbols: {list(self.gene_filter_symbols)[:5]}")
-
-            # Check for rsID column
-            rsid_column = None
-            for col in gene_df.columns:
-                if col.lower() in ['rsid', 'rs_id', 'rs id', 'rsid_paper']:
-                    rsid_column = col
-                    break
+                print(f"  Example symbols: {self.gene_filter_symbols[:5].to_pylist()}")
 
             if rsid_column:
-                # Extract unique rsIDs and remove any null values
-                rsids = gene_df[rsid_column].dropna().unique()
-                # Clean rsIDs to ensure they start with 'rs'
-                cleaned_rsids = []
-                for rsid in rsids:
-                    rsid_str = str(rsid).strip()
-                    if rsid_str.startswith('rs'):
-                        cleaned_rsids.append(rsid_str)
-
-                self.gene_filter_rsids = set(cleaned_rsids)
+                # Extract unique rsIDs, removing null values and entries that don't start with 'rs'
+                rsids = gene_df[rsid_column].dropna().astype('string[pyarrow]').str.strip()
+                cleaned_rsids = pd.unique(rsids[rsids.str.startswith('rs')])
+                self.gene_filter_rsids = pa.array(cleaned_rsids, type=pa.string())
                 print(f"✓ Loaded {len(self.gene_filter_rsids)} rsIDs for filtering")
-                print(f"  Example rsIDs: {list(self.gene_filter_rsids)[:5]}")
+                print(f"  Example rsIDs: {self.gene_filter_rsids[:5].to_pylist()}")
 
             # Ensure at least one filter type was found
             if not self.gene_filter_symbols and not self.gene_filter_rsids:
-                available_columns = list(gene_df.columns)
                 raise ValueError(f"Gene filter file must contain either a 'Symbol' column or 'rsID' column. "
                                f"Available columns: {available_columns}")
 
@@ -224,109 +361,162 @@ class AdditionalZarrFilter:
             print(f"Error loading gene filter file '{gene_filter_file}': {e}")
             raise
 
-    def apply_gene_filter(self, df):
-        """Apply gene, rsID, and BED region filtering."""
-        if not self.gene_filter_symbols and not self.gene_filter_rsids and not self.bed_regions:
-            print("No gene, rsID, or BED region filters loaded - returning original data")
-            return df
+    @staticmethod
+    def normalize_chrom(chrom):
+        """Normalize a CHROM Series to the BED key format (lowercase, 'chr' removed)."""
+        return chrom.astype(str).str.lower().str.replace('chr', '', regex=False)
+
+    def compute_bed_mask(self, df):
+        """Return a boolean Series marking rows whose CHROM/POS fall inside any BED region."""
+        # Normalize chromosome names once to match BED format (remove 'chr' if present)
+        chrom_norm = self.normalize_chrom(df['CHROM'])
+        # Rows with invalid positions become NaN and never match
+        pos = pd.to_numeric(df['POS'], errors='coerce').to_numpy(dtype=np.float64)
+
+        if NUMBA_AVAILABLE:
+            # Chromosomes absent from the BED file get code -1 and never match
+            chrom_codes = pd.Index(list(self.bed_by_chrom)).get_indexer(chrom_norm).astype(np.int64)
+            mask = _bed_mask_kernel(pos, chrom_codes, *self.bed_flat_index)
+            return pd.Series(mask, index=df.index)
+
+        mask = np.zeros(len(df), dtype=bool)
+        for chrom, (starts, ends_cummax) in self.bed_by_chrom.items():
+            rows = np.flatnonzero((chrom_norm == chrom).to_numpy())
+            if len(rows) == 0:
+                continue
+            row_pos = pos[rows]
+            # Last region starting at or before each position; overlap if the furthest end reaches it
+            idx = np.searchsorted(starts, row_pos, side='right') - 1
+            mask[rows] = (idx >= 0) & (row_pos <= ends_cummax[np.maximum(idx, 0)])
+
+        return pd.Series(mask, index=df.index)
+
+    def compute_delimited_match_mask(self, series, filter_values):
+        """Return a boolean Series marking rows where any delimited token is in filter_values (Arrow string array)."""
+        needles = self.get_needle_table(filter_values) if filter_kernel.NUMBA_AVAILABLE else None
+        mask = filter_kernel.delimited_match_mask(series, filter_values, needles)
+        return pd.Series(mask, index=series.index)
+
+    def get_needle_table(self, filter_values):
+        """Return the (cached) Numba needle table for a filter value array."""
+        cached = self._needle_tables.get(id(filter_values))
+        if cached is None or cached[0] is not filter_values:
+            cached = (filter_values, filter_kernel.NeedleTable(filter_values))
+            self._needle_tables[id(filter_values)] = cached
+        return cached[1]
+
+    def get_active_filters(self, columns):
+        """Return the names of loaded filters whose required columns exist in the data."""
+        active_filters = []
+        if self.bed_by_chrom and 'CHROM' in columns and 'POS' in columns:
+            active_filters.append('bed')
+        if self.gene_filter_symbols and "ANN['SYMBOL']" in columns:
+            active_filters.append('gene')
+        if self.gene_filter_rsids and 'ID' in columns:
+            active_filters.append('rsid')
+        return active_filters
+
+    def compute_filter_masks(self, df, short_circuit=False):
+        """
+        Compute one boolean mask column per active filter.
 
-        original_rows = len(df)
-        masks = []
+        Works on any row subset independently, so it can be mapped over Dask partitions.
 
+        Args:
+            df: DataFrame with the filter columns
+            short_circuit: Stop evaluating filters once every row is already kept
+                (skipped filters are left out of the result, so columns can vary)
+        """
+        active_filters = self.get_active_filters(df.columns)
+        mask_functions = {
+            'bed': lambda: self.compute_bed_mask(df),
+            'gene': lambda: self.compute_delimited_match_mask(df["ANN['SYMBOL']"], self.gene_filter_symbols),
+            'rsid': lambda: self.compute_delimited_match_mask(df['ID'], self.gene_filter_rsids),
+        }
+        masks = {}
+        kept = np.zeros(len(df), dtype=bool)
+        for name in active_filters:
+            if short_circuit and kept.all():
+                # OR with further masks cannot drop rows, so skip the remaining filters
+                break
+            masks[name] = mask_functions[name]()
+            kept |= masks[name].to_numpy()
+        return pd.DataFrame(masks, index=df.index, columns=list(masks))
+
+    def combine_filter_masks(self, masks, fetch_rows):
+        """
+        Report per-filter matches and combine the mask columns with OR logic.
+
+        Args:
+            masks: DataFrame of boolean mask columns from compute_filter_masks
+            fetch_rows: Callable returning the CHROM/POS rows at given positions (for examples)
+
+        Returns:
+            Combined boolean NumPy array, or None if no filter columns were applicable
+        """
         # Apply BED region filtering if available
-        if self.bed_regions and 'CHROM' in df.columns and 'POS' in df.columns:
-            print(f"🛏️  Applying BED region filtering with {len(self.bed_regions)} regions...")
-            print(f"    Data has {len(df)} rows to check")
-
-            def check_bed_overlap(row):
-                # Convert chromosome format to match BED (remove 'chr' if present)
-                chrom = str(row['CHROM']).lower().replace('chr', '')
-                try:
-                    pos = int(row['POS'])
-                except (ValueError, TypeError):
-                    return False  # Skip rows with invalid positions
-
-                # Check each BED region for overlap
-                for region in self.bed_regions:
-                    bed_chrom, bed_start, bed_end = region
-                    if (chrom == str(bed_chrom).lower() and
-                        int(bed_start) <= pos <= int(bed_end)):
-                        return True
-                return False
-
-            bed_mask = df.apply(check_bed_overlap, axis=1)
-            masks.append(bed_mask)
+        if 'bed' in masks.columns:
+            bed_mask = masks['bed']
+            print(f"🛏️  Applying BED region filtering with {len(self.bed_start)} regions...")
+            print(f"    Data has {len(masks)} rows to check")
+
             bed_matches = bed_mask.sum()
             print(f"🛏️  BED REGION FILTERING: {bed_matches:,} rows match BED regions")
-            print(f"    {len(df) - bed_matches:,} rows will be filtered out")
+            print(f"    {len(masks) - bed_matches:,} rows will be filtered out")
 
             # Debug: show some examples of what was kept/filtered
-            if len(df) > 0:
-                kept_examples = df[bed_mask].head(3)
+            if self.verbose and len(masks) > 0:
+                kept_examples = fetch_rows(np.flatnonzero(bed_mask.to_numpy())[:3])
                 if len(kept_examples) > 0:
                     print("   Examples of KEPT rows:")
-                    for idx, row in kept_examples.iterrows():
-                        chrom = str(row['CHROM']).lower().replace('chr', '')
-                        pos = row['POS']
+                    kept_chrom = self.normalize_chrom(kept_examples['CHROM'])
+                    for chrom, pos in zip(kept_chrom, kept_examples['POS'].to_numpy()):
                         print(f"     Chr {chrom}, Pos {pos}")
 
-                filtered_examples = df[~bed_mask].head(3)
+                filtered_examples = fetch_rows(np.flatnonzero(~bed_mask.to_numpy())[:3])
                 if len(filtered_examples) > 0:
                     print("   Examples of FILTERED OUT rows:")
-                    for idx, row in filtered_examples.iterrows():
-                        chrom = str(row['CHROM']).lower().replace('chr', '')
-                        pos = row['POS']
+                    filtered_chrom = self.normalize_chrom(filtered_examples['CHROM'])
+                    for chrom, pos in zip(filtered_chrom, filtered_examples['POS'].to_numpy()):
                         print(f"     Chr {chrom}, Pos {pos}")
 
         # Apply gene symbol filtering if available
-        if self.gene_filter_symbols and "ANN['SYMBOL']" in df.columns:
-            def check_gene_match(symbols_str):
-                if pd.isna(symbols_str) or symbols_str == '' or symbols_str == '.':
-                    return False
-
-                # ANN['SYMBOL'] can contain multiple symbols separated by various delimiters
-                # Common delimiters: semicolon, comma, pipe, ampersand
-                symbols = str(symbols_str).replace(';', '|').replace(',', '|').replace('&', '|').split('|')
-                symbols = [s.strip() for s in symbols if s.strip()]
-
-                # Check if any symbol matches our filter
-                return any(symbol in self.gene_filter_symbols for symbol in symbols)
-
-            gene_mask = df["ANN['SYMBOL']"].apply(check_gene_match)
-            masks.append(gene_mask)
-            symbol_matches = gene_mask.sum()
+        if 'gene' in masks.columns:
+            symbol_matches = masks['gene'].sum()
             print(f"🧬 GENE SYMBOL FILTERING: {symbol_matches:,} rows match gene symbols")
 
         # Apply rsID filtering if available
-        if self.gene_filter_rsids and 'ID' in df.columns:
-            def check_rsid_match(id_str):
-                if pd.isna(id_str) or id_str == '' or id_str == '.':
-                    return False
+        if 'rsid' in masks.columns:
+            rsid_matches = masks['rsid'].sum()
+            print(f"🆔 rsID FILTERING: {rsid_matches:,} rows match rsIDs")
 
-                # ID column can contain multiple IDs separated by various delimiters
-                ids = str(id_str).replace(';', '|').replace(',', '|').replace('&', '|').split('|')
-                ids = [id_val.strip() for id_val in ids if id_val.strip()]
+        if len(masks.columns) == 0:
+            print("Warning: No applicable columns found for filtering.")
+            return None
 
-                # Check if any ID matches our rsID filter
-                return any(id_val in self.gene_filter_rsids for id_val in ids)
+        # Combine masks with OR logic (keep rows that match either filter) in one pass
+        return np.logical_or.reduce(masks.to_numpy(dtype=bool), axis=1)
 
-            rsid_mask = df['ID'].apply(check_rsid_match)
-            masks.append(rsid_mask)
-            rsid_matches = rsid_mask.sum()
-            print(f"🆔 rsID FILTERING: {rsid_matches:,} rows match rsIDs")
+    def build_filter_mask(self, df):
+        """
+        Build the combined OR mask for gene, rsID, and BED region filters.
 
-        # Combine masks with OR logic (keep rows that match either filter)
-        if masks:
-            combined_mask = masks[0]
-            for mask in masks[1:]:
-                combined_mask = combined_mask | mask
+        Returns None when no filters are loaded or no filter columns exist in df.
+        """
+        if not self.gene_filter_symbols and not self.gene_filter_rsids and not self.bed_by_chrom:
+            print("No gene, rsID, or BED region filters loaded - returning original data")
+            return None
 
-            filtered_df = df[combined_mask].copy()
-        else:
-            print("Warning: No applicable columns found for filtering.")
-            return df
+        masks = self.compute_filter_masks(df, short_circuit=True)
+        combined_mask = self.combine_filter_masks(masks, lambda positions: df.iloc[positions])
+
+        skipped_filters = [name for name in self.get_active_filters(df.columns) if name not in masks.columns]
+        if skipped_filters and combined_mask is not None:
+            print(f"⏭️  Skipped {', '.join(skipped_filters)} filtering: all rows already kept")
+        return combined_mask
 
-        filtered_rows = len(filtered_df)
+    def report_filter_results(self, original_rows, filtered_rows):
+        """Print a summary of the combined filtering results."""
         removed_rows = original_rows - filtered_rows
 
         print("🎯 COMBINED FILTERING RESULTS:")
@@ -334,21 +524,122 @@ class AdditionalZarrFilter:
         print(f"   FILTERED: {filtered_rows:,} rows")
         print(f"   REMOVED:  {removed_rows:,} rows ({(removed_rows/original_rows)*100 if original_rows else 0:.1f}%)")
 
+    def apply_gene_filter(self, df):
+        """Apply gene, rsID, and BED region filtering."""
+        if len(df) == 0:
+            print("Input data is empty - nothing to filter")
+            return df
+
+        combined_mask = self.build_filter_mask(df)
+        if combined_mask is None:
+            return df
+
+        if combined_mask.all():
+            # Every row is kept - skip the row gather
+            filtered_df = df
+        else:
+            # Fancy indexing already returns a new frame, so no defensive copy is needed
+            filtered_df = df.iloc[np.flatnonzero(combined_mask)]
+        self.report_filter_results(len(df), len(filtered_df))
+
         return filtered_df
 
+    def apply_gene_filter_to_dataset(self, ds):
+        """
+        Apply gene, rsID, and BED region filtering to a Zarr-backed Dataset.
+
+        Returns the surviving rows as a DataFrame; see filter_dataset for the lazy selection.
+        """
+        if len(ds.dims) != 1:
+            # Not a flat variant table - fall back to filtering the full DataFrame
+            return self.apply_gene_filter(ds.to_dataframe().reset_index())
+
+        return self.filter_dataset(ds).to_dataframe().reset_index()
+
+    def filter_dataset(self, ds):
+        """
+        Select the rows of a flat (1-D) Zarr-backed Dataset that pass the combined filters.
+
+        Only the CHROM, POS, ANN['SYMBOL'] and ID variables are loaded to build the
+        mask, one Zarr chunk per worker on a thread pool. The result is a lazy isel of
+        the input, so no other column is read until it is computed or written.
+        """
+        dim = next(iter(ds.dims))
+        if ds.sizes[dim] == 0:
+            print("Input data is empty - nothing to filter")
+            return ds
+
+        if not self.gene_filter_symbols and not self.gene_filter_rsids and not self.bed_by_chrom:
+            print("No gene, rsID, or BED region filters loaded - returning original data")
+            return ds
+
+        filter_ds = ds[[col for col in self.FILTER_COLUMNS if col in ds.data_vars]]
+        if not filter_ds.data_vars:
+            print("Warning: No applicable columns found for filtering.")
+            return ds
+        first_variable = next(iter(filter_ds.data_vars.values()))
+        block_sizes = first_variable.chunks[0] if first_variable.chunks else (ds.sizes[dim],)
+        block_starts = np.concatenate(([0], np.cumsum(block_sizes)[:-1]))
+
+        def mask_block(start, size):
+            # Each block builds its own masks against the read-only filter structures. The
+            # block is read synchronously, so the thread pool below is the only parallelism.
+            block = filter_ds.isel({dim: slice(start, start + size)}).compute(scheduler='synchronous')
+            return self.compute_filter_masks(block.to_dataframe())
+
+        # Chunks are independent; Zarr decompression, Arrow string ops and the kernels release the GIL
+        with ThreadPoolExecutor(max_workers=max(1, min(len(block_sizes), os.cpu_count() or 1))) as executor:
+            masks = pd.concat(list(executor.map(mask_block, block_starts, block_sizes)), ignore_index=True)
+
+        def fetch_rows(positions):
+            return ds[['CHROM', 'POS']].isel({dim: positions}).to_dataframe()
+
+        combined_mask = self.combine_filter_masks(masks, fetch_rows)
+        if combined_mask is None:
+            return ds
+
+        # Every row kept means no row selection is needed
+        filtered_ds = ds if combined_mask.all() else ds.isel({dim: np.flatnonzero(combined_mask)})
+        self.report_filter_results(ds.sizes[dim], filtered_ds.sizes[dim])
+
+        return filtered_ds
+
     def prepare_dataframe_for_xarray(self, df):
-        """Prepare DataFrame for xarray conversion by ensuring consistent data types."""
-        df_clean = df.copy()
+        """
+        Prepare DataFrame for xarray conversion by ensuring consistent data types.
 
-        for col in df_clean.columns:
-            # Convert object columns with mixed types to string
-            if df_clean[col].dtype == 'object':
-                df_clean[col] = df_clean[col].astype(str)
+        Converts columns in place; only object columns holding mixed value types are cast.
+        """
+        for col in df.columns:
+            # Convert object columns with mixed types to string (homogeneous strings are left as is)
+            if df[col].dtype == 'object':
+                kind = pd.api.types.infer_dtype(df[col], skipna=True)
+                if kind not in ('string', 'empty'):
+                    df[col] = df[col].astype('string')
 
-        return df_clean
+        return df
 
     def process_zarr_file(self, input_path, output_path=None):
-        """Process a Zarr file with gene filtering."""
+        """
+        Process a Zarr file with gene filtering.
+
+        Returns:
+            Tuple of the output path and the filtered DataFrame
+        """
+        output_path, filtered = self.filter_zarr_file(input_path, output_path)
+        if isinstance(filtered, xr.Dataset):
+            filtered = dataset_to_dataframe(filtered)
+        return output_path, filtered
+
+    def filter_zarr_file(self, input_path, output_path=None):
+        """
+        Filter a Zarr file and write the filtered output store.
+
+        Returns:
+            Tuple of the output path and the filtered data: for flat variant tables the lazy
+            Dataset of the written output (nothing is loaded until it is computed), otherwise
+            the filtered DataFrame
+        """
         print(f"Processing Zarr file: {input_path}")
 
         # Validate input file
@@ -357,8 +648,8 @@ class AdditionalZarrFilter:
             raise FileNotFoundError(f"Input Zarr file not found: {input_path}")
 
         # Get filter files from config
-        gene_filter_file = self.get_gene_filter_from_config()
-        bed_file = self.get_bed_file_from_config()
+        gene_filter_file = self.gene_filter_file
+        bed_file = self.bed_file
 
         # Load gene filter if available
         if gene_filter_file:
@@ -380,21 +671,34 @@ class AdditionalZarrFilter:
 
         # Load the Zarr file
         print("Loading Zarr data...")
-        ds = xr.open_zarr(str(input_path))
-        df = ds.to_dataframe().reset_index()
-
-        print(f"Original data shape: {df.shape}")
-
-        # Apply gene filtering
-        filtered_df = self.apply_gene_filter(df)
+        # Configured drop columns that no filter reads are skipped when the store is opened
+        # (names come from the group metadata); the others are dropped after filtering
+        store_variables = set(zarr.open_group(str(input_path), mode='r').array_keys())
+        open_drops = [col for col in self.drop_columns
+                      if col in store_variables and col not in self.FILTER_COLUMNS]
+        ds = xr.open_zarr(str(input_path), drop_variables=open_drops)
+        # Rows of the flattened table (as to_dataframe gives them), for flat and multi-dimensional stores
+        original_rows = int(np.prod(list(ds.sizes.values())))
+
+        print(f"Original data: {original_rows:,} rows, {len(ds.data_vars) + len(open_drops)} columns")
+
+        # Flat variant tables stay lazy: filter, drop columns and write straight from the Dataset
+        is_flat_table = len(ds.dims) == 1
+
+        # Apply gene filtering (only filter columns are loaded before the mask is applied)
+        if is_flat_table:
+            filtered = self.filter_dataset(ds)
+        else:
+            filtered = self.apply_gene_filter_to_dataset(ds)
 
         # Apply column dropping
-        filtered_df = self.apply_column_dropping(filtered_df)
+        filtered = self.apply_column_dropping(filtered, dropped_at_open=open_drops)
+        filtered_rows = max(filtered.sizes.values(), default=0) if is_flat_table else len(filtered)
 
         # Determine output path
         if output_path is None:
             # Get output directory from config
-            output_dir_str = self.get_output_dir_from_config()
+            output_dir_str = self.output_dir
             output_dir = Path(output_dir_str)
             output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -414,48 +718,52 @@ class AdditionalZarrFilter:
 
         print(f"Output path: {output_path}")
 
-        # Prepare DataFrame for xarray conversion
-        print("Preparing data for Zarr conversion...")
-        df_clean = self.prepare_dataframe_for_xarray(filtered_df)
-
-        # Convert to xarray
-        ds_filtered = df_clean.to_xarray()
+        if not is_flat_table:
+            # Prepare DataFrame for xarray conversion
+            print("Preparing data for Zarr conversion...")
+            filtered = self.prepare_dataframe_for_xarray(filtered)
 
         # Add metadata
-        ds_filtered.attrs['original_file'] = str(input_path)
-        ds_filtered.attrs['processing_type'] = 'gene_filtered'
-        ds_filtered.attrs['original_rows'] = len(df)
-        ds_filtered.attrs['filtered_rows'] = len(filtered_df)
+        attrs = {
+            'original_file': str(input_path),
+            'processing_type': 'gene_filtered',
+            'original_rows': int(original_rows),
+            'filtered_rows': int(filtered_rows),
+        }
 
         if gene_filter_file:
-            ds_filtered.attrs['gene_filter_file'] = str(gene_filter_file)
-            gene_count = len(self.gene_filter_symbols) if self.gene_filter_symbols else 0
-            rsid_count = len(self.gene_filter_rsids) if self.gene_filter_rsids else 0
-            ds_filtered.attrs['gene_filter_count'] = gene_count
-            ds_filtered.attrs['rsid_filter_count'] = rsid_count
+            attrs['gene_filter_file'] = str(gene_filter_file)
+            attrs['gene_filter_count'] = len(self.gene_filter_symbols) if self.gene_filter_symbols else 0
+            attrs['rsid_filter_count'] = len(self.gene_filter_rsids) if self.gene_filter_rsids else 0
 
         if bed_file:
-            ds_filtered.attrs['bed_file'] = str(bed_file)
-            bed_count = len(self.bed_regions) if self.bed_regions else 0
-            ds_filtered.attrs['bed_region_count'] = bed_count
+            attrs['bed_file'] = str(bed_file)
+            attrs['bed_region_count'] = len(self.bed_start) if self.bed_start is not None else 0
 
         # Add column information
-        column_dtypes = {col: str(df_clean[col].dtype) for col in df_clean.columns}
-        ds_filtered.attrs['column_dtypes'] = str(column_dtypes)
+        dtypes = {name: var.dtype for name, var in filtered.variables.items()} if is_flat_table else filtered.dtypes
+        attrs['column_dtypes'] = json.dumps({col: str(dtype) for col, dtype in dtypes.items()})
 
-        # Save filtered Zarr
+        # Save filtered Zarr (Dask writes the selected rows chunk by chunk, no pandas round-trip)
         print("Saving filtered Zarr file...")
-        ds_filtered.to_zarr(str(output_path), mode='w')
+        if is_flat_table:
+            write_dataset_to_zarr(filtered, output_path, attrs=attrs)
+            # Hand back the written output lazily; callers load it only if they need rows
+            filtered = xr.open_zarr(str(output_path))
+        else:
+            write_dataframe_to_zarr(filtered, output_path, attrs=attrs)
 
         print(f"✓ Successfully saved filtered Zarr: {output_path}")
-        print(f"  Original rows: {len(df):,}")
-        print(f"  Filtered rows: {len(filtered_df):,}")
+        print(f"  Original rows: {original_rows:,}")
+        print(f"  Filtered rows: {filtered_rows:,}")
 
-        return str(output_path), filtered_df
+        return str(output_path), filtered
 
 
 def main():
     """Main entry point."""
+    initialize_config()
+
     parser = argparse.ArgumentParser(
         description="Apply gene, rsID, and BED region filtering to Zarr files",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -495,15 +803,16 @@ Configuration:
     parser.add_argument('--output', '-o', help='Output Zarr file path (default: data/additional_filtering/{input_name}_add_filter.zarr)')
     parser.add_argument('--export-tsv', action='store_true', help='Also export processed data as TSV file')
     parser.add_argument('--tsv-output', help='TSV output file path (default: same as zarr output with .tsv extension)')
+    parser.add_argument('--quiet', action='store_true', help='Do not print example kept/filtered rows during BED filtering')
 
     args = parser.parse_args()
 
     try:
         # Initialize filter
-        filter_processor = AdditionalZarrFilter(args.config)
+        filter_processor = AdditionalZarrFilter(args.config, verbose=not args.quiet)
 
         # Process the file
-        output_path, processed_df = filter_processor.process_zarr_file(
+        output_path, processed = filter_processor.filter_zarr_file(
             input_path=args.input,
             output_path=args.output
         )
@@ -534,35 +843,27 @@ Configuration:
                 tsv_path = str(zarr_path.parent / f"{zarr_path.stem}.tsv")
 
             print(f"Exporting processed data to TSV: {tsv_path}")
-
-            # Convert nullable types to standard types for TSV export
-            export_df = processed_df.copy()
-            for col in export_df.columns:
-                if export_df[col].dtype.name in ['Int64', 'boolean']:
-                    # Convert nullable types to standard types, replacing NaN with appropriate values
-                    if export_df[col].dtype.name == 'Int64':
-                        export_df[col] = export_df[col].astype('float64')  # Will show NaN for missing
-                    elif export_df[col].dtype.name == 'boolean':
-                        export_df[col] = export_df[col].astype('object')  # Will show None for missing
+            # Only the TSV export needs the filtered rows in memory
+            processed_df = dataset_to_dataframe(processed) if isinstance(processed, xr.Dataset) else processed
 
             # Reorder columns if priority_columns is specified and valid
+            export_columns = list(processed_df.columns)
             if priority_columns:
-                # Only use priority columns that exist in the DataFrame
-                valid_priority_order = [col for col in priority_columns if col in export_df.columns]
-                # Get remaining columns (not in priority list)
-                remaining_cols = [col for col in export_df.columns if col not in valid_priority_order]
-                # Sort remaining columns alphabetically
-                remaining_cols_sorted = sorted(remaining_cols)
+                # Only use priority columns that exist in the DataFrame (set lookups, duplicates dropped)
+                available_cols = set(export_columns)
+                valid_priority_order = [col for col in dict.fromkeys(priority_columns) if col in available_cols]
+                # Sort remaining columns (not in priority list) alphabetically
+                remaining_cols_sorted = sorted(available_cols.difference(valid_priority_order))
                 # Reorder: priority columns first, then remaining columns sorted
-                export_df = export_df[valid_priority_order + remaining_cols_sorted]
+                export_columns = valid_priority_order + remaining_cols_sorted
                 print(f"✓ Column reordering applied: {len(valid_priority_order)} priority columns at start, {len(remaining_cols_sorted)} remaining columns sorted")
 
-            # Save to TSV
-            export_df.to_csv(tsv_path, sep='\t', index=False, na_rep='.')
+            # Save to TSV (nullable Int64/boolean missing values are written as '.')
+            write_tsv(processed_df, tsv_path, columns=export_columns)
             print(f"✓ Successfully exported TSV: {tsv_path}")
 
             # Report file sizes
-            zarr_size_mb = sum(f.stat().st_size for f in Path(output_path).rglob('*') if f.is_file()) / (1024 * 1024)
+            zarr_size_mb = get_directory_size(output_path) / (1024 * 1024)
             tsv_size_mb = Path(tsv_path).stat().st_size / (1024 * 1024)
             print("\n📁 FILE SIZES:")
             print(f"   Zarr file: {zarr_size_mb:.1f} MB")
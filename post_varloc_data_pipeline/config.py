@@ -1,3 +1,5 @@
+from copy import deepcopy
+from functools import lru_cache
 from pathlib import Path
 
 from dotenv import load_dotenv, find_dotenv
@@ -6,13 +8,8 @@ import os
 
 import yaml
 
-
-# Load environment variables from .env file if it exists
-load_dotenv(find_dotenv())
-
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parents[1]
-logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
 
 DATA_DIR = PROJ_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
@@ -24,16 +21,28 @@ EXTERNAL_DATA_DIR = DATA_DIR / "external"
 MODELS_DIR = PROJ_ROOT / "models"
 
 
+@lru_cache(maxsize=8)
+def _parse_yaml_cached(yaml_path, mtime_ns, size):
+    """
+    Load a YAML file once per (path, modification time, size).
+    The stat fields are part of the cache key so edited files are re-read.
+    """
+    with open(yaml_path, 'r') as f:
+        return yaml.safe_load(f)
+
 
 def parse_yaml(yaml_path=None):
     """
     Parse a YAML file and return the loaded dictionary.
     If yaml_path is None, defaults to PROJ_ROOT/config.yaml.
+    Results are cached per resolved path; callers get their own copy.
     """
     if yaml_path is None:
         yaml_path = PROJ_ROOT / "config.yaml"
-    with open(yaml_path, 'r') as f:
-        return yaml.safe_load(f)
+    yaml_path = Path(yaml_path).resolve()
+    stat = yaml_path.stat()
+    return deepcopy(_parse_yaml_cached(str(yaml_path), stat.st_mtime_ns, stat.st_size))
+
 
 def parse_config(config_path=None):
     """
@@ -86,14 +95,36 @@ FIGURES_DIR = REPORTS_DIR / "figures"
 TEST_DIR = PROJ_ROOT / "tests"
 TEST_DATA_DIR = TEST_DIR / "data"
 
-# If tqdm is installed, configure loguru with tqdm.write
-# https://github.com/Delgan/loguru/issues/135
-try:
-    from tqdm import tqdm
+_ENV_INITIALIZED = False
+
+
+def initialize_config():
+    """
+    Run the environment side effects of the project configuration once per process.
+
+    Loads a .env file if one exists, routes loguru through tqdm.write when tqdm is
+    installed, and logs PROJ_ROOT. Kept out of module import so importing the config
+    helpers stays cheap; CLI entry points call this at startup.
+    """
+    global _ENV_INITIALIZED
+    if _ENV_INITIALIZED:
+        return
+    _ENV_INITIALIZED = True
+
+    # Load environment variables from .env file if it exists
+    load_dotenv(find_dotenv())
+
+    # If tqdm is installed, configure loguru with tqdm.write
+    # https://github.com/Delgan/loguru/issues/135
+    try:
+        from tqdm import tqdm
+
+        logger.remove(0)
+        logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
+    except (ModuleNotFoundError, ValueError):
+        # ValueError: the default handler was already removed by the caller
+        pass
 
-    logger.remove(0)
-    logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
-except ModuleNotFoundError:
-    pass
+    logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
 
 
@@ -4,55 +4,106 @@ Extract ANN data types from ann_types.md and create a configuration file
 for use with tsv_preprocess_to_zarr.py
 """
 
-import re
 import csv
 import argparse
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Tuple
 
 
-def parse_markdown_table(content: str, section_name: str) -> List[Tuple[str, str]]:
+# Line preceding the table of annotations with non-string types in each section
+CUSTOM_TYPES_MARKER = "Annotations with custom types:"
+
+# Type keywords mapped to non-string dtypes, checked in this order (so 'dict[str, float]' is
+# float64); int64 and bool rather than nullable Int64/boolean for zarr compatibility
+VEP_TYPE_KEYWORDS = (
+    ('int', 'int64'),
+    ('float', 'float64'),
+    ('bool', 'bool'),
+)
+
+
+def parse_all_sections(content: str) -> Dict[str, List[Tuple[str, str]]]:
     """
-    Parse a markdown table and extract column name and type information.
+    Parse the custom types table of every section in one pass over the markdown.
+
+    Each line containing '##' starts a section named by its heading text. Within a section,
+    the custom types marker is followed by a blank line and then the table, whose rows run
+    until the next blank line (the header and separator rows are skipped).
 
     Args:
         content (str): Markdown content
-        section_name (str): Section name (e.g., "vep", "snpEff")
+
+    Returns:
+        Dict[str, List[Tuple[str, str]]]: (column_name, data_type) tuples per lowercased
+        section name; sections without a custom types table map to an empty list
+    """
+    sections = {}
+    table_lines = None
+    state = None
+    for line in content.splitlines():
+        if '##' in line:
+            # A repeated heading keeps its first table, as a search for the heading would
+            table_lines = []
+            sections.setdefault(line.lstrip('#').strip().lower(), table_lines)
+            state = 'marker'
+        elif state == 'marker':
+            if CUSTOM_TYPES_MARKER in line:
+                state = 'blank'
+        elif state == 'blank':
+            if not line:
+                state = 'table'
+        elif state == 'table':
+            if line:
+                table_lines.append(line)
+            elif table_lines:
+                state = None
+
+    return {name: parse_table_rows(lines) for name, lines in sections.items()}
+
+
+def parse_table_rows(table_lines: List[str]) -> List[Tuple[str, str]]:
+    """
+    Extract (column_name, data_type) pairs from the lines of a markdown table.
+
+    Args:
+        table_lines (List[str]): Table lines, starting with the header and separator rows
 
     Returns:
         List[Tuple[str, str]]: List of (column_name, data_type) tuples
     """
     results = []
+    # Parse table rows (skip header and separator)
+    for line in table_lines[2:]:
+        if line.strip() and line.startswith('|'):
+            parts = [part.strip() for part in line.split('|')[1:-1]]  # Remove empty first/last
+            if len(parts) >= 2:
+                column_name = parts[0].strip('`')
+                type_info = parts[1]
+                results.append((column_name, type_info))
 
-    # Find the section
-    section_pattern = rf"## {section_name}.*?(?=##|\Z)"
-    section_match = re.search(section_pattern, content, re.DOTALL | re.IGNORECASE)
+    return results
 
-    if not section_match:
-        print(f"Warning: Section '{section_name}' not found")
-        return results
-
-    section_content = section_match.group(0)
-
-    # Find tables with custom types
-    custom_types_pattern = r"Annotations with custom types:.*?\n\n(.*?)(?=\n\n|\Z)"
-    custom_match = re.search(custom_types_pattern, section_content, re.DOTALL)
-
-    if custom_match:
-        table_content = custom_match.group(1)
-        # Parse table rows (skip header and separator)
-        lines = table_content.strip().split('\n')
-        for line in lines[2:]:  # Skip header and separator
-            if line.strip() and line.startswith('|'):
-                parts = [part.strip() for part in line.split('|')[1:-1]]  # Remove empty first/last
-                if len(parts) >= 2:
-                    column_name = parts[0].strip('`')
-                    type_info = parts[1]
-                    results.append((column_name, type_info))
 
-    return results
+def parse_markdown_table(content: str, section_name: str) -> List[Tuple[str, str]]:
+    """
+    Parse a markdown table and extract column name and type information.
 
+    Args:
+        content (str): Markdown content
+        section_name (str): Section name (e.g., "vep", "snpEff")
+
+    Returns:
+        List[Tuple[str, str]]: List of (column_name, data_type) tuples
+    """
+    sections = parse_all_sections(content)
+    if section_name.lower() not in sections:
+        print(f"Warning: Section '{section_name}' not found")
+        return []
+    return sections[section_name.lower()]
 
+
+@lru_cache(maxsize=None)
 def map_vep_types_to_pandas(type_info: str) -> str:
     """
     Map VEP type information to pandas/numpy dtypes.
@@ -66,47 +117,62 @@ def map_vep_types_to_pandas(type_info: str) -> str:
     type_info = type_info.lower()
 
     # Direct mappings - use standard numpy dtypes for zarr compatibility
-    if 'int' in type_info:
-        return 'int64'  # Use standard int64, not nullable Int64
-    elif 'float' in type_info:
-        return 'float64'
-    elif 'bool' in type_info:
-        return 'bool'  # Use standard bool, not nullable boolean
-    elif 'list[str]' in type_info or 'list[term]' in type_info:
-        return 'string'  # Will be stored as string representation
-    elif 'dict[str, float]' in type_info or 'dict[str, any]' in type_info:
-        return 'string'  # Will be stored as string representation
-    elif 'consequences' in type_info or 'list[term]' in type_info:
-        return 'string'
-    elif 'posrange' in type_info or 'rangetotal' in type_info:
-        return 'string'  # Complex types stored as strings
-    else:
-        return 'string'  # Default fallback
+    for keyword, dtype in VEP_TYPE_KEYWORDS:
+        if keyword in type_info:
+            return dtype
 
+    # list[str], list[term], dict[str, any], consequences, posrange, rangetotal, ...
+    return 'string'  # Complex types stored as string representation
 
-def create_dtype_config(ann_types: List[Tuple[str, str]], output_file: str, prefix: str = "ANN['", suffix: str = "']") -> None:
+
+def build_dtype_rows(ann_types: List[Tuple[str, str]], prefix: str = "ANN['", suffix: str = "']") -> List[Tuple[str, str]]:
     """
-    Create a CSV configuration file with column names and data types.
+    Map (column_name, type_info) tuples to the (full column name, dtype) rows of a config file.
 
     Args:
         ann_types (List[Tuple[str, str]]): List of (column_name, type_info) tuples
-        output_file (str): Output CSV file path
         prefix (str): Prefix to add to column names (e.g., "ANN['")
         suffix (str): Suffix to add to column names (e.g., "']")
+
+    Returns:
+        List[Tuple[str, str]]: List of (full_column_name, pandas_dtype) rows
+    """
+    rows = []
+    for column_name, type_info in ann_types:
+        # Override specific columns that contain dictionary data as strings
+        if column_name in ['SIFT', 'PolyPhen']:
+            pandas_dtype = 'string'
+        else:
+            pandas_dtype = map_vep_types_to_pandas(type_info)
+        rows.append((f"{prefix}{column_name}{suffix}", pandas_dtype))
+    return rows
+
+
+def write_dtype_config(rows: List[Tuple[str, str]], output_file: str) -> None:
+    """
+    Write (column_name, dtype) rows to a CSV configuration file.
+
+    Args:
+        rows (List[Tuple[str, str]]): Rows from build_dtype_rows
+        output_file (str): Output CSV file path
     """
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(['column_name', 'dtype'])
+        writer.writerows(rows)
 
-        for column_name, type_info in ann_types:
-            full_column_name = f"{prefix}{column_name}{suffix}"
-            pandas_dtype = map_vep_types_to_pandas(type_info)
 
-            # Override specific columns that contain dictionary data as strings
-            if column_name in ['SIFT', 'PolyPhen']:
-                pandas_dtype = 'string'
+def create_dtype_config(ann_types: List[Tuple[str, str]], output_file: str, prefix: str = "ANN['", suffix: str = "']") -> None:
+    """
+    Create a CSV configuration file with column names and data types.
 
-            writer.writerow([full_column_name, pandas_dtype])
+    Args:
+        ann_types (List[Tuple[str, str]]): List of (column_name, type_info) tuples
+        output_file (str): Output CSV file path
+        prefix (str): Prefix to add to column names (e.g., "ANN['")
+        suffix (str): Suffix to add to column names (e.g., "']")
+    """
+    write_dtype_config(build_dtype_rows(ann_types, prefix, suffix), output_file)
 
 
 def main():
@@ -136,19 +202,27 @@ def main():
     output_dir = Path(args.output_dir)
     output_dir.mkdir(exist_ok=True)
 
+    # Parse every section's custom types table in one pass
+    sections = parse_all_sections(content)
+    for section_name in ("vep", "snpEff"):
+        if section_name.lower() not in sections:
+            print(f"Warning: Section '{section_name}' not found")
+
     # Extract VEP types
-    vep_types = parse_markdown_table(content, "vep")
+    vep_types = sections.get("vep", [])
+    vep_rows = build_dtype_rows(vep_types, args.prefix, args.suffix)
     if vep_types:
         vep_output = output_dir / "vep_ann_dtypes.csv"
-        create_dtype_config(vep_types, str(vep_output), args.prefix, args.suffix)
+        write_dtype_config(vep_rows, str(vep_output))
         print(f"Created VEP dtype config: {vep_output}")
         print(f"Found {len(vep_types)} VEP ANN columns with custom types")
 
     # Extract snpEff types
-    snpeff_types = parse_markdown_table(content, "snpEff")
+    snpeff_types = sections.get("snpeff", [])
+    snpeff_rows = build_dtype_rows(snpeff_types, args.prefix, args.suffix)
     if snpeff_types:
         snpeff_output = output_dir / "snpeff_ann_dtypes.csv"
-        create_dtype_config(snpeff_types, str(snpeff_output), args.prefix, args.suffix)
+        write_dtype_config(snpeff_rows, str(snpeff_output))
         print(f"Created snpEff dtype config: {snpeff_output}")
         print(f"Found {len(snpeff_types)} snpEff ANN columns with custom types")
 
@@ -158,7 +232,8 @@ def main():
         references_dir = Path("references")
         references_dir.mkdir(exist_ok=True)
         combined_output = references_dir / "combined_ann_dtypes.csv"
-        create_dtype_config(all_types, str(combined_output), args.prefix, args.suffix)
+        # The combined config reuses the rows already mapped for the two sections
+        write_dtype_config(vep_rows + snpeff_rows, str(combined_output))
         print(f"Created combined dtype config: {combined_output}")
         print(f"Total unique ANN columns: {len(set(col for col, _ in all_types))}")
 
@@ -0,0 +1,212 @@
+"""
+Numba kernels for matching delimited string cells against a set of filter values.
+
+Cells such as ANN['SYMBOL'] = "GENE1;GENE2&GENE3" are scanned directly over the Arrow
+offsets/data buffers: the bytes are split on ';', ',', '&' and '|', trimmed of ASCII
+whitespace, and each token is probed in a hash table built from the filter values.
+A small bloom bit-array in front of the table rejects most non-matching tokens with a
+single memory load. No Python string objects are created per token.
+
+Kernels release the GIL rather than using numba's parallel layer: AdditionalZarrFilter.filter_dataset
+calls delimited_match once per Zarr chunk from its own thread pool, which already keeps every core busy.
+
+delimited_match_mask is the shared entry point for a pandas column; it falls back to splitting
+the cells in pandas when numba is not installed or no NeedleTable is given.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Delimiters separating multiple entries in a cell (ANN['SYMBOL'], ID): ; , & |
+DELIMITER_RE = re.compile(r'[;,&|]')
+
+# Bloom prefilter size: 8192 64-bit words (64 KB, fits in L2), one bit set per filter value
+BLOOM_WORDS = 8192
+
+try:
+    from numba import njit
+
+    @njit(nogil=True, cache=True)
+    def _fnv1a(data, start, end):
+        """64-bit FNV-1a hash of data[start:end]."""
+        h = np.uint64(14695981039346656037)
+        for k in range(start, end):
+            h ^= np.uint64(data[k])
+            h *= np.uint64(1099511628211)
+        return h
+
+    @njit(nogil=True, cache=True)
+    def _hash_strings(offsets, data):
+        """Hash every string of an Arrow offsets/data buffer pair."""
+        n = len(offsets) - 1
+        hashes = np.empty(n, dtype=np.uint64)
+        for i in range(n):
+            hashes[i] = _fnv1a(data, offsets[i], offsets[i + 1])
+        return hashes
+
+    @njit(nogil=True, cache=True)
+    def _is_delimiter(b):
+        return b == 59 or b == 44 or b == 38 or b == 124  # ; , & |
+
+    @njit(nogil=True, cache=True)
+    def _is_space(b):
+        return b == 32 or (9 <= b <= 13)
+
+    @njit(nogil=True, cache=True)
+    def _build_bloom(hashes):
+        """Set one bit per needle hash in a BLOOM_WORDS x 64-bit array."""
+        bloom = np.zeros(BLOOM_WORDS, dtype=np.uint64)
+        for h in hashes:
+            bloom[(h >> np.uint64(6)) & np.uint64(BLOOM_WORDS - 1)] |= np.uint64(1) << (h & np.uint64(63))
+        return bloom
+
+    @njit(nogil=True, cache=True)
+    def _probe(data, start, end, bloom, needle_hashes, needle_starts, needle_ends, needle_data):
+        """Return True if data[start:end] equals one of the needles."""
+        h = _fnv1a(data, start, end)
+        # Most tokens are not needles; reject them with one load before the binary search
+        if not (bloom[(h >> np.uint64(6)) & np.uint64(BLOOM_WORDS - 1)] >> (h & np.uint64(63))) & np.uint64(1):
+            return False
+        j = np.searchsorted(needle_hashes, h)
+        length = end - start
+        while j < len(needle_hashes) and needle_hashes[j] == h:
+            ns = needle_starts[j]
+            if needle_ends[j] - ns == length:
+                equal = True
+                for k in range(length):
+                    if data[start + k] != needle_data[ns + k]:
+                        equal = False
+                        break
+                if equal:
+                    return True
+            j += 1
+        return False
+
+    @njit(nogil=True, cache=True)
+    def _delimited_match_kernel(offsets, data, bloom, needle_hashes, needle_starts, needle_ends, needle_data):
+        """Mark cells where any delimited, whitespace-trimmed token is a needle."""
+        n = len(offsets) - 1
+        mask = np.zeros(n, dtype=np.bool_)
+        for i in range(n):
+            cell_end = offsets[i + 1]
+            token_start = offsets[i]
+            for k in range(offsets[i], cell_end + 1):
+                if k == cell_end or _is_delimiter(data[k]):
+                    a = token_start
+                    b = k
+                    while a < b and _is_space(data[a]):
+                        a += 1
+                    while b > a and _is_space(data[b - 1]):
+                        b -= 1
+                    if _probe(data, a, b, bloom, needle_hashes, needle_starts, needle_ends, needle_data):
+                        mask[i] = True
+                        break
+                    token_start = k + 1
+        return mask
+
+    NUMBA_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMBA_AVAILABLE = False
+
+
+def _string_buffers(values: pa.Array):
+    """
+    Return the (int64 offsets, uint8 data) buffers of a string array.
+
+    Args:
+        values: Arrow string or large_string array
+
+    Returns:
+        Tuple of NumPy arrays, offsets sliced to the array's own rows
+    """
+    values = pc.cast(values, pa.large_string())
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    _, offsets_buffer, data_buffer = values.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[values.offset:values.offset + len(values) + 1]
+    data = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.empty(0, dtype=np.uint8)
+    return offsets, data
+
+
+class NeedleTable:
+    """Hash table of filter values laid out for the Numba probe (bloom bits, sorted hashes plus byte ranges)."""
+
+    def __init__(self, values: pa.Array):
+        """
+        Build the table from the filter values.
+
+        Args:
+            values: Arrow string array of filter values (nulls are ignored)
+        """
+        values = pc.drop_null(values)
+        offsets, self.data = _string_buffers(values)
+        hashes = _hash_strings(offsets, self.data)
+        order = np.argsort(hashes, kind='stable')
+        self.hashes = hashes[order]
+        self.starts = offsets[:-1][order]
+        self.ends = offsets[1:][order]
+        self.bloom = _build_bloom(self.hashes)
+
+
+def delimited_match(cells: pa.Array, needles: NeedleTable) -> np.ndarray:
+    """
+    Mark cells where any delimited token equals a filter value.
+
+    Args:
+        cells: Arrow string array of cell values (null cells never match)
+        needles: NeedleTable built from the filter values
+
+    Returns:
+        Boolean NumPy array with one entry per cell
+    """
+    offsets, data = _string_buffers(cells)
+    mask = _delimited_match_kernel(offsets, data, needles.bloom, needles.hashes, needles.starts, needles.ends,
+                                   needles.data)
+    if cells.null_count:
+        mask &= ~cells.is_null().to_numpy(zero_copy_only=False)
+    return mask
+
+
+def delimited_match_mask(series: pd.Series, values, needles: NeedleTable = None) -> np.ndarray:
+    """
+    Mark rows where any delimited token of the cell is one of the filter values.
+
+    The cells are encoded as categories, so each distinct cell is split and checked only
+    once and the hits are mapped back through the codes. Tokens are split on DELIMITER_RE
+    and trimmed; missing cells never match.
+
+    Args:
+        series: Cell values
+        values: Filter values, as an Arrow string array or a collection of str
+        needles: Optional NeedleTable of the same values; with numba installed the distinct
+            cells are then scanned by delimited_match instead of being split in pandas
+
+    Returns:
+        Boolean NumPy array with one entry per row
+    """
+    cells = series.astype('string').astype('category')
+    categories = cells.cat.categories
+
+    # Missing cells have code -1, which maps to a trailing False entry
+    category_hits = np.zeros(len(categories) + 1, dtype=bool)
+
+    if needles is not None and NUMBA_AVAILABLE:
+        # Scan the category strings' Arrow buffers directly - no per-token Python strings
+        category_hits[:-1] = delimited_match(pa.array(categories, type=pa.string()), needles)
+    else:
+        tokens = (pd.Series(categories, dtype='string')
+                  .str.split(DELIMITER_RE)
+                  .explode()
+                  .str.strip())
+        if isinstance(values, pa.Array):
+            token_hits = pc.is_in(pa.array(tokens, type=pa.string()), value_set=values)
+            token_hits = token_hits.to_numpy(zero_copy_only=False)
+        else:
+            token_hits = tokens.isin(values).to_numpy(dtype=bool)
+        category_hits[tokens.index.to_numpy()[token_hits]] = True
+
+    return category_hits[cells.cat.codes.to_numpy()]
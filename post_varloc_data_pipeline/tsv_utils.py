@@ -0,0 +1,62 @@
+"""
+Shared helpers for exporting pipeline DataFrames as TSV files.
+"""
+
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Rows converted to Arrow per write, so the whole frame is never held as a second copy
+TSV_BATCH_ROWS = 65_536
+
+
+def is_text_formatted(dtype) -> bool:
+    """
+    Return whether a column of this dtype is written as pre-formatted text.
+
+    Arrow formats booleans as true/false and floats without '.0' or exponents (1.0 -> 1,
+    1e-05 -> 0.00001); these columns are formatted the way pandas.to_csv writes them instead.
+    """
+    return pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_float_dtype(dtype)
+
+
+def format_as_text(series: pd.Series) -> pd.Series:
+    """Format a column as pandas.to_csv writes it ('True', '1.0', '1e-05'), with None for missing values."""
+    return series.astype(str).astype(object).where(series.notna(), None)
+
+
+def write_tsv(df: pd.DataFrame, tsv_path: Union[str, Path], columns: Optional[List[str]] = None,
+              na_rep: str = '.') -> None:
+    """
+    Write a DataFrame to a tab-separated file without the index.
+
+    Uses pyarrow's multithreaded CSV writer, streaming the rows in batches of TSV_BATCH_ROWS
+    against one schema inferred from the full columns. Boolean and float columns are formatted
+    as text first, so the file matches pandas.to_csv byte for byte. Falls back to pandas.to_csv for data Arrow
+    cannot write unquoted (values containing tabs, quotes or newlines, list or mixed-type columns).
+
+    Args:
+        df: DataFrame to export
+        tsv_path: Output TSV path
+        columns: Optional column order/subset to write (default: all columns in order)
+        na_rep: String written for missing values
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+    write_options = pa_csv.WriteOptions(delimiter='\t', null_string=na_rep,
+                                        quoting_style='none', quoting_header='none')
+    try:
+        schema = pa.Schema.from_pandas(df[columns], preserve_index=False)
+        text_columns = [col for col in columns if is_text_formatted(df[col].dtype)]
+        for col in text_columns:
+            schema = schema.set(schema.get_field_index(col), pa.field(col, pa.string()))
+        with pa_csv.CSVWriter(str(tsv_path), schema, write_options=write_options) as writer:
+            for start in range(0, len(df), TSV_BATCH_ROWS):
+                batch = df.iloc[start:start + TSV_BATCH_ROWS]
+                if text_columns:
+                    batch = batch.assign(**{col: format_as_text(batch[col]) for col in text_columns})
+                writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        df.to_csv(tsv_path, sep='\t', index=False, na_rep=na_rep, columns=columns)
@@ -1,15 +1,59 @@
 import os
+import sys
 import argparse
 import csv
-from typing import Dict, Tuple
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import warnings
+import zarr
+
+# Add parent directory to path to access the pipeline modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from post_varloc_data_pipeline.zarr_utils import ZarrTableWriter
 
 # Suppress Zarr v3 specification warnings
 warnings.filterwarnings('ignore', message='.*vlen-utf8.*not part in the Zarr format 3 specification.*')
 warnings.filterwarnings('ignore', message='.*StringDType.*not part in the Zarr format 3 specification.*')
 warnings.filterwarnings('ignore', message='.*Consolidated metadata.*not part in the Zarr format 3 specification.*')
 
+# Rows read, converted and written to Zarr per batch; bounds memory for multi-GB TSVs
+DEFAULT_CHUNK_ROWS = 500_000
+
+# Bytes per Arrow CSV block (large sequential reads); the streaming reader infers column
+# types from the first block, so a larger block also makes the C parser fallback rarer
+ARROW_BLOCK_SIZE = 32 << 20
+
+# Low-cardinality TSV columns read as categoricals: each distinct value is stored once per
+# batch instead of once per row, and they stay text even if every value looks numeric
+CATEGORICAL_COLUMNS = ('CHROM',)
+
+# String columns with at most max(MIN_CATEGORY_LIMIT, LOW_CARDINALITY_RATIO * batch rows)
+# distinct values are stored as categoricals within each batch
+LOW_CARDINALITY_RATIO = 0.1
+MIN_CATEGORY_LIMIT = 64
+
+# Rows per Parquet row group (--format parquet); each group is compressed and read independently
+PARQUET_ROW_GROUP_ROWS = 100_000
+
+# Dtype of the columns the dtype file declares as strings: Arrow-backed on pandas 2 and 3,
+# where a plain 'str' is an object column on pandas 2
+STRING_DTYPE = 'string[pyarrow]'
+
+# Cells counted as False when a column is converted to bool
+BOOL_NULL_TOKENS = ['', '.', 'NA', 'NULL', 'null']
+
+# Missing-value tokens pandas' read_csv recognizes by default
+TSV_NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                   '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
 
 def arg_parser() -> argparse.Namespace:
     """
@@ -21,23 +65,177 @@ def arg_parser() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description='Preprocess TSV: clean headers, add family and filename columns, and convert to Zarr.'
     )
-    parser.add_argument('--input', type=str, help='TSV file name', required=True)
-    parser.add_argument('--output', type=str, help='Output folder location', default=None)
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument('--input', type=str, help='TSV file name')
+    input_group.add_argument('--inputs', type=str, nargs='+',
+                             help='Several TSV files (e.g. one per family), converted in parallel')
+    parser.add_argument('--jobs', type=int, default=1,
+                       help='Number of --inputs files converted at once in separate processes (default: 1)')
+    parser.add_argument('--output', type=str, help='Output folder location (default: folder of each input)',
+                       default=None)
     parser.add_argument('--rename_map', type=str, help='Optional CSV file with old,new header names', default=None)
     parser.add_argument('--dtype_file', type=str, help='CSV file with column data types',
                        default='references/combined_ann_dtypes.csv')
     parser.add_argument('--skip_dtypes', action='store_true', help='Skip applying data types from dtype_file')
+    parser.add_argument('--chunk_rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                       help='Number of TSV rows read and written to Zarr per batch')
+    parser.add_argument('--format', choices=['zarr', 'parquet'], default='zarr',
+                       help='Output format: Zarr store (default) or a Zstd-compressed Parquet file')
+    parser.add_argument('--force', action='store_true',
+                       help='Rebuild the output even if it is newer than the TSV and config files')
 
     args = parser.parse_args()
 
-    if args.output is None:
+    if args.output is None and args.input:
         args.output = os.path.dirname(args.input)
-    if not os.path.exists(args.output):
+    if args.output is not None and not os.path.exists(args.output):
         os.makedirs(args.output)
 
     return args
 
 
+def is_output_up_to_date(output_file: str, source_files: List[str]) -> bool:
+    """
+    Check whether a completed output is newer than every file it was built from.
+
+    A Zarr store counts as completed once its final_shape attribute has been written, which
+    happens when the conversion closes the store, so an interrupted run is redone. Parquet
+    output only appears under its final name once it has been closed.
+
+    Args:
+        output_file (str): Output Zarr store or Parquet file path.
+        source_files (List[str]): Input TSV and config files the output depends on.
+
+    Returns:
+        bool: True if the output is complete and no source file was modified after it.
+    """
+    if os.path.isdir(output_file):
+        # Root metadata rewritten when the store is closed (Zarr v3 / v2 consolidated metadata)
+        metadata_files = [path for path in (os.path.join(output_file, 'zarr.json'),
+                                            os.path.join(output_file, '.zmetadata'))
+                          if os.path.exists(path)]
+        if not metadata_files or 'final_shape' not in zarr.open_group(output_file, mode='r').attrs:
+            return False
+        output_mtime = max(os.path.getmtime(path) for path in metadata_files)
+    elif os.path.isfile(output_file):
+        output_mtime = os.path.getmtime(output_file)
+    else:
+        return False
+    return all(os.path.getmtime(path) <= output_mtime for path in source_files)
+
+
+class ParquetTableWriter:
+    """
+    Write a Parquet file batch by batch, with the same interface as ZarrTableWriter.
+
+    The schema is taken from the first batch and later batches are converted to it, so an
+    integer column whose later batch holds missing values (read as float64) stays a nullable
+    int64 column. A column with no values in the first batch (common for sparse ANN fields)
+    is typed as a nullable string, since Parquet cannot promote it later as ZarrTableWriter
+    does; numbers in later batches are stored as their text. The file is written under a
+    '.partial' name and moved into place by close(), so an interrupted run never leaves a
+    truncated file at the output path.
+    """
+
+    def __init__(self, output_path: str, row_group_size: int = PARQUET_ROW_GROUP_ROWS):
+        """
+        Prepare the output file.
+
+        Args:
+            output_path (str): Output Parquet file path (overwritten on close).
+            row_group_size (int): Rows per Parquet row group.
+        """
+        self.output_path = str(output_path)
+        self.partial_path = self.output_path + '.partial'
+        self.row_group_size = row_group_size
+        self.writer = None
+        self.nrows = 0
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Append the rows of a DataFrame to the file.
+
+        Args:
+            df (pd.DataFrame): Batch to write; must have the first batch's columns.
+        """
+        if self.writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            empty_columns = set(df.columns[df.isna().all().to_numpy()]) if len(df) else set()
+            fields = []
+            for field in schema:
+                if pa.types.is_dictionary(field.type):
+                    # Categoricals of later batches may have more categories than int8 codes hold
+                    # (one without any category yet holds strings)
+                    value_type = field.type.value_type
+                    field = field.with_type(pa.dictionary(pa.int32(), pa.string() if pa.types.is_null(value_type)
+                                                          else value_type))
+                elif field.name in empty_columns:
+                    # No value to infer a type from yet; later text must still fit
+                    field = field.with_type(pa.string())
+                fields.append(field)
+            schema = pa.schema(fields, metadata=schema.metadata)
+            self.writer = pq.ParquetWriter(self.partial_path, schema, compression='zstd',
+                                           compression_level=3, use_dictionary=True)
+        try:
+            table = pa.Table.from_pandas(self.match_string_columns(df), schema=self.writer.schema,
+                                         preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, KeyError) as e:
+            self.abort()
+            # Not pa.ArrowInvalid itself, which main() takes as a TSV parse failure
+            raise ValueError(f"Batch starting at row {self.nrows:,} does not match the columns and types "
+                             f"of the first batch written to {self.output_path}: {e}") from e
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.nrows += len(df)
+
+    def match_string_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert non-string batch columns that the schema stores as strings to text.
+
+        Args:
+            df (pd.DataFrame): Batch to write.
+
+        Returns:
+            pd.DataFrame: The batch, with those columns as str (missing values stay missing).
+        """
+        converted = {}
+        for field in self.writer.schema:
+            value_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+            is_string = pa.types.is_string(value_type) or pa.types.is_large_string(value_type)
+            if is_string and field.name in df.columns:
+                values = df[field.name]
+                if not pd.api.types.is_string_dtype(values.dtype) or values.dtype == object:
+                    converted[field.name] = values.astype(STRING_DTYPE)
+        return df.assign(**converted) if converted else df
+
+    def abort(self) -> None:
+        """Close the writer and remove the partial file, e.g. after a batch failed to convert."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+    def close(self, attrs: dict = None) -> None:
+        """
+        Write the file metadata and move the file to its output path.
+
+        Args:
+            attrs (dict): Optional JSON-serializable attributes, stored as JSON-encoded
+                key-value metadata.
+        """
+        if attrs:
+            self.writer.add_key_value_metadata({key: json.dumps(value) for key, value in attrs.items()})
+        self.writer.close()
+        os.replace(self.partial_path, self.output_path)
+
+
+# Table writers for --format, all with append(df), nrows, close(attrs) and abort()
+TABLE_WRITERS = {
+    'zarr': ZarrTableWriter,
+    'parquet': ParquetTableWriter,
+}
+
+
 def get_family_and_filename(tsv_path: str) -> Tuple[str, str]:
     """
     Extract family name and filename from TSV file path.
@@ -46,13 +244,24 @@ def get_family_and_filename(tsv_path: str) -> Tuple[str, str]:
         tsv_path (str): Path to the TSV file.
 
     Returns:
-        Tuple[str, str]: Family name (first part before '.') and full filename.
+        Tuple[str, str]: Family name (first part of the filename before '.') and full filename.
     """
-    filename = os.path.basename(tsv_path)
-    family = filename.split('.')[0]
+    # Only the final path component is split, so dots in directory names don't matter
+    filename = Path(tsv_path).name
+    family = filename.partition('.')[0]
     return family, filename
 
 
+@lru_cache(maxsize=32)
+def _load_rename_map_cached(rename_map_path: str, mtime_ns: int, size: int) -> Dict[str, str]:
+    """
+    Parse a rename map CSV once per (path, modification time, size).
+    The stat fields are part of the cache key so edited files are re-read.
+    """
+    with open(rename_map_path, 'r', encoding='utf-8') as f:
+        return {row[0]: row[1] for row in csv.reader(f) if len(row) == 2}
+
+
 def load_rename_map(rename_map_path: str) -> Dict[str, str]:
     """
     Load column rename mapping from CSV file.
@@ -61,16 +270,31 @@ def load_rename_map(rename_map_path: str) -> Dict[str, str]:
         rename_map_path (str): Path to CSV file containing old,new column name pairs.
 
     Returns:
-        Dict[str, str]: Dictionary mapping old column names to new column names.
+        Dict[str, str]: Dictionary mapping old column names to new column names
+        (a fresh copy of the cached mapping).
+    """
+    if not rename_map_path or not os.path.exists(rename_map_path):
+        return {}
+    rename_map_path = os.path.realpath(rename_map_path)
+    stat = os.stat(rename_map_path)
+    return dict(_load_rename_map_cached(rename_map_path, stat.st_mtime_ns, stat.st_size))
+
+
+@lru_cache(maxsize=8)
+def _load_dtype_mapping_cached(dtype_file: str, mtime_ns: int, size: int) -> Dict[str, str]:
+    """
+    Parse a dtype CSV once per (path, modification time, size).
+    The stat fields are part of the cache key so edited files are re-read.
     """
-    rename_dict = {}
-    if rename_map_path and os.path.exists(rename_map_path):
-        with open(rename_map_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) == 2:
-                    rename_dict[row[0]] = row[1]
-    return rename_dict
+    dtype_dict = {}
+    with open(dtype_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            column_name = row.get('column_name', '').strip()
+            dtype = row.get('dtype', '').strip()
+            if column_name and dtype:
+                dtype_dict[column_name] = dtype
+    return dtype_dict
 
 
 def load_dtype_mapping(dtype_file: str = "references/combined_ann_dtypes.csv") -> Dict[str, str]:
@@ -81,22 +305,18 @@ def load_dtype_mapping(dtype_file: str = "references/combined_ann_dtypes.csv") -
         dtype_file (str): Path to CSV file containing column_name,dtype pairs.
 
     Returns:
-        Dict[str, str]: Dictionary mapping column names to pandas data types.
+        Dict[str, str]: Dictionary mapping column names to pandas data types
+        (a fresh copy of the cached mapping).
     """
-    dtype_dict = {}
-    if os.path.exists(dtype_file):
-        print(f"Loading data types from: {dtype_file}")
-        with open(dtype_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                column_name = row.get('column_name', '').strip()
-                dtype = row.get('dtype', '').strip()
-                if column_name and dtype:
-                    dtype_dict[column_name] = dtype
-        print(f"Loaded {len(dtype_dict)} data type mappings")
-    else:
+    if not os.path.exists(dtype_file):
         print(f"Warning: Data type file not found: {dtype_file}")
+        return {}
 
+    print(f"Loading data types from: {dtype_file}")
+    resolved_path = os.path.realpath(dtype_file)
+    stat = os.stat(resolved_path)
+    dtype_dict = dict(_load_dtype_mapping_cached(resolved_path, stat.st_mtime_ns, stat.st_size))
+    print(f"Loaded {len(dtype_dict)} data type mappings")
     return dtype_dict
 
 
@@ -123,8 +343,9 @@ def convert_pandas_dtypes(dtype_dict: Dict[str, str]) -> Dict[str, str]:
             # Use standard bool for zarr compatibility
             pandas_dtypes[column] = 'bool'
         elif dtype == 'string':
-            # Use object type for string data in zarr
-            pandas_dtypes[column] = 'object'
+            # Arrow-backed strings keep no Python object per cell; the Zarr writer stores
+            # them as vlen-utf8 like object strings
+            pandas_dtypes[column] = STRING_DTYPE
         else:
             # Default to object for unknown types
             pandas_dtypes[column] = 'object'
@@ -132,130 +353,412 @@ def convert_pandas_dtypes(dtype_dict: Dict[str, str]) -> Dict[str, str]:
     return pandas_dtypes
 
 
-def apply_dtypes_to_dataframe(df: pd.DataFrame, dtype_dict: Dict[str, str]) -> pd.DataFrame:
+def coerce_dtype_columns(df: pd.DataFrame, dtype_dict: Dict[str, str]) -> Dict[str, pd.Series]:
+    """
+    Convert the columns of a DataFrame that do not have their configured data type yet,
+    handling missing/blank values for zarr compatibility.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame (not modified).
+        dtype_dict (Dict[str, str]): Dictionary mapping column names to pandas dtypes.
+
+    Returns:
+        Dict[str, pd.Series]: Converted columns by name, to be swapped into the DataFrame.
+    """
+    pandas_dtypes = {column: dtype for column, dtype in convert_pandas_dtypes(dtype_dict).items()
+                     if column in df.columns}
+
+    converted = {}
+    for column, target_dtype in pandas_dtypes.items():
+        values = df[column]
+        if values.dtype == target_dtype or (target_dtype == STRING_DTYPE and pd.api.types.is_string_dtype(values.dtype)):
+            # The reader already parsed the column to its final type (e.g. Arrow inferred
+            # float64, or read text as strings), so there is nothing to coerce
+            continue
+        try:
+            # Missing value representations ('', '.', 'NA', 'NULL', 'null') are not numbers,
+            # so to_numeric(errors='coerce') turns them into NaN in the same pass as the
+            # conversion; no separate replace() scan is needed
+            if target_dtype == 'int64':
+                # For integers, missing values become 0
+                converted[column] = pd.to_numeric(values, errors='coerce').fillna(0).astype('int64')
+            elif target_dtype == 'float64':
+                # For floats, missing values stay NaN (which float64 handles naturally)
+                converted[column] = pd.to_numeric(values, errors='coerce')
+            elif target_dtype == 'bool':
+                # For booleans, missing values become False: one hash-set lookup per cell masks
+                # them, instead of a replace() scan per token
+                converted[column] = values.astype('bool') & ~values.isin(BOOL_NULL_TOKENS)
+            else:
+                # For object/string types, keep as is
+                converted[column] = values.astype(target_dtype)
+
+        except (ValueError, TypeError) as e:
+            # e.g. 'inf' in an int64 column; one bad cell must not abort the whole file
+            print(f"Warning: Could not convert column '{column}' to {target_dtype}: {e}")
+            # Keep as object if conversion fails
+            converted[column] = values.astype('object')
+    return converted
+
+
+def apply_dtypes_to_dataframe(df: pd.DataFrame, dtype_dict: Dict[str, str], verbose: bool = True) -> pd.DataFrame:
     """
     Apply data types to DataFrame columns, handling missing/blank values for zarr compatibility.
 
     Args:
         df (pd.DataFrame): Input DataFrame.
         dtype_dict (Dict[str, str]): Dictionary mapping column names to pandas dtypes.
+        verbose (bool): Whether to print the number of converted columns.
 
     Returns:
         pd.DataFrame: DataFrame with corrected data types.
     """
+    converted = coerce_dtype_columns(df, dtype_dict)
+
+    # Swap in all converted columns with one assign rather than a setitem per column,
+    # each of which would rebuild the column index of the wide batch
+    if converted:
+        df = df.assign(**converted)
+
+    if verbose:
+        print(f"Successfully applied data types to {sum(column in df.columns for column in dtype_dict)} columns")
+    return df
+
+
+def categorize_low_cardinality_columns(df: pd.DataFrame,
+                                       converted: Dict[str, pd.Series] = None) -> Dict[str, pd.Categorical]:
+    """
+    Convert string columns with few distinct values (consequence terms, FILTER, gene
+    symbols, ...) to categoricals.
+
+    Each distinct value is then held once per batch, and the writers gather the values by
+    code instead of converting every cell. The values read back unchanged.
+
+    Args:
+        df (pd.DataFrame): Batch (not modified).
+        converted (Dict[str, pd.Series]): Columns from coerce_dtype_columns that replace
+            those of df.
+
+    Returns:
+        Dict[str, pd.Categorical]: Categorical columns by name, to be swapped into the batch.
+    """
+    converted = converted or {}
+    max_categories = max(MIN_CATEGORY_LIMIT, int(len(df) * LOW_CARDINALITY_RATIO))
+    categorized = {}
+    for column in df.columns:
+        values = converted.get(column, df[column])
+        if not pd.api.types.is_string_dtype(values.dtype):
+            continue
+        # One factorize both counts the distinct values and provides the category codes
+        codes, uniques = pd.factorize(values)
+        if len(uniques) <= max_categories:
+            categorized[column] = pd.Categorical.from_codes(codes, categories=uniques)
+    return categorized
+
+
+def get_string_read_columns(dtype_dict: Dict[str, str], rename_dict: Dict[str, str]) -> List[str]:
+    """
+    List the TSV columns the dtype file declares as strings, under their names in the TSV.
+
+    These columns are read as text directly, so the reader does not infer (and the batch
+    conversion then undo) a numeric type for them, and an empty first block cannot fix them
+    to a null type.
+
+    Args:
+        dtype_dict (Dict[str, str]): Column data types, keyed by the renamed column names.
+        rename_dict (Dict[str, str]): Column rename mapping (may be empty).
+
+    Returns:
+        List[str]: Original TSV names of the string columns.
+    """
+    original_names = {new: old for old, new in rename_dict.items()}
     pandas_dtypes = convert_pandas_dtypes(dtype_dict)
+    return [original_names.get(column, column) for column, dtype in pandas_dtypes.items()
+            if dtype in (STRING_DTYPE, 'object')]
 
-    converted_count = 0
-    for column, target_dtype in pandas_dtypes.items():
-        if column in df.columns:
-            try:
-                # Handle common missing value representations
-                if target_dtype in ['int64', 'float64', 'bool']:
-                    # Replace common missing value representations with appropriate values
-                    if target_dtype == 'int64':
-                        # For integers, replace missing with 0 or a sentinel value
-                        df[column] = df[column].replace(['', '.', 'NA', 'NULL', 'null'], 0)
-                        # Convert to numeric first, then to int
-                        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int64')
-                    elif target_dtype == 'float64':
-                        # For floats, replace missing with NaN (which float64 handles naturally)
-                        df[column] = df[column].replace(['', '.', 'NA', 'NULL', 'null'], pd.NA)
-                        df[column] = pd.to_numeric(df[column], errors='coerce')
-                    elif target_dtype == 'bool':
-                        # For booleans, replace missing with False
-                        df[column] = df[column].replace(['', '.', 'NA', 'NULL', 'null'], False)
-                        df[column] = df[column].astype('bool')
-                else:
-                    # For object/string types, keep as is
-                    df[column] = df[column].astype(target_dtype)
-
-                converted_count += 1
-
-            except (ValueError, TypeError) as e:
-                print(f"Warning: Could not convert column '{column}' to {target_dtype}: {e}")
-                # Keep as object if conversion fails
-                df[column] = df[column].astype('object')
-
-    print(f"Successfully applied data types to {converted_count} columns")
+
+def iter_tsv_chunks(tsv_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                    string_columns: Iterable[str] = ()) -> Iterator[pd.DataFrame]:
+    """
+    Read a vembrane TSV file in batches of rows.
+
+    Only one batch is held in memory at a time, so inputs of several GB can be converted
+    without loading the whole table. Batches keep a running RangeIndex. Floats are parsed
+    round-trip exact, matching the values the pyarrow engine reads, and CATEGORICAL_COLUMNS
+    are read as categoricals.
+
+    Args:
+        tsv_path (str): Path to the TSV file.
+        chunk_rows (int): Number of rows per batch.
+        string_columns (Iterable[str]): Columns read as text without type inference.
+
+    Returns:
+        Iterator[pd.DataFrame]: Batches with the TSV header as columns.
+    """
+    return pd.read_csv(tsv_path, sep='\t', header=0, chunksize=chunk_rows, low_memory=False,
+                       float_precision='round_trip',
+                       dtype={**dict.fromkeys(string_columns, STRING_DTYPE), **dict.fromkeys(CATEGORICAL_COLUMNS, 'category')})
+
+
+def iter_arrow_tsv_chunks(tsv_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                          string_columns: Iterable[str] = ()) -> Iterator[pd.DataFrame]:
+    """
+    Read a vembrane TSV file in batches of rows with pyarrow's streaming CSV reader.
+
+    Arrow's C++ tokenizer parses each block straight into typed column buffers, several
+    times faster than pandas' C parser, and missing values follow pandas' defaults. Column
+    types are fixed from the first block, so a later value that does not fit (e.g. text in
+    a column that was empty so far) raises pa.ArrowInvalid; use iter_tsv_chunks then.
+    CATEGORICAL_COLUMNS are dictionary-encoded while parsing and become categoricals, and
+    text columns become STRING_DTYPE columns.
+
+    Args:
+        tsv_path (str): Path to the TSV file.
+        chunk_rows (int): Minimum number of rows per batch (whole Arrow blocks are kept together).
+        string_columns (Iterable[str]): Columns read as text without type inference.
+
+    Returns:
+        Iterator[pd.DataFrame]: Batches with the TSV header as columns.
+    """
+    column_types = {column: pa.string() for column in string_columns}
+    column_types.update((column, pa.dictionary(pa.int32(), pa.string())) for column in CATEGORICAL_COLUMNS)
+
+    # Arrow's own file stream (an OSFile; gzip etc. decompressed by extension) reads whole
+    # blocks straight into C++ buffers, and is closed as soon as the file has been consumed
+    with pa.input_stream(tsv_path) as source:
+        reader = pacsv.open_csv(
+            source,
+            read_options=pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True),
+            parse_options=pacsv.ParseOptions(delimiter='\t'),
+            convert_options=pacsv.ConvertOptions(null_values=TSV_NULL_VALUES, strings_can_be_null=True,
+                                                 column_types=column_types),
+        )
+        # Columns with no values in the first block are null-typed; pandas reads them as float64 NaN
+        schema = pa.schema([field.with_type(pa.float64()) if pa.types.is_null(field.type) else field
+                            for field in reader.schema])
+
+        # Text columns stay Arrow-backed (STRING_DTYPE) instead of becoming object columns
+        string_types = {pa.string(): pd.StringDtype('pyarrow')}
+
+        batches = []
+        nrows = 0
+        yielded = False
+        for batch in reader:
+            batches.append(batch)
+            nrows += batch.num_rows
+            if nrows >= chunk_rows:
+                yield pa.Table.from_batches(batches).cast(schema).to_pandas(types_mapper=string_types.get)
+                yielded = True
+                batches = []
+                nrows = 0
+        if batches or not yielded:
+            yield pa.Table.from_batches(batches, schema=reader.schema).cast(schema).to_pandas(types_mapper=string_types.get)
+
+
+def process_chunk(df: pd.DataFrame, rename_dict: Dict[str, str], dtype_dict: Dict[str, str],
+                  family: str, filename: str, verbose: bool = True) -> pd.DataFrame:
+    """
+    Apply renaming, data types, and the family/filename columns to one batch of rows.
+
+    Args:
+        df (pd.DataFrame): Batch read from the TSV.
+        rename_dict (Dict[str, str]): Column rename mapping (may be empty).
+        dtype_dict (Dict[str, str]): Column data types (empty to skip type conversion).
+        family (str): Family name for the 'family' column.
+        filename (str): Source filename for the 'filename' column.
+        verbose (bool): Whether to print conversion details (done for the first batch).
+
+    Returns:
+        pd.DataFrame: Batch ready to be written to Zarr.
+    """
+    # Apply custom column renaming if provided
+    if rename_dict:
+        df.rename(columns=rename_dict, inplace=True)
+        if verbose:
+            print(f"Applied {len(rename_dict)} column renames")
+
+    # Apply data types if provided
+    converted = {}
+    if dtype_dict:
+        if verbose:
+            print("Applying data types...")
+        converted = coerce_dtype_columns(df, dtype_dict)
+        if verbose:
+            print(f"Successfully applied data types to {sum(column in df.columns for column in dtype_dict)} columns")
+
+    categorized = categorize_low_cardinality_columns(df, converted)
+    if verbose and categorized:
+        print(f"Stored {len(categorized)} low-cardinality string columns as categoricals: {', '.join(categorized)}")
+    converted.update(categorized)
+
+    # All replaced columns are swapped in with one assign, then family and filename are
+    # prepended with one concat, so the wide batch is rebuilt twice rather than per column.
+    # Family and filename hold one value each, so they are single-category categoricals
+    # (one int8 code per row) rather than a string per row
+    if converted:
+        df = df.assign(**converted)
+    constant_codes = np.zeros(len(df), dtype=np.int8)
+    source_columns = pd.DataFrame({
+        'family': pd.Categorical.from_codes(constant_codes, categories=[family]),
+        'filename': pd.Categorical.from_codes(constant_codes, categories=[filename]),
+    }, index=df.index)
+    df = pd.concat([source_columns, df], axis=1)
+
+    if verbose:
+        # Report memory usage of one batch
+        memory_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+        print(f"Batch memory usage: {memory_mb:.1f} MB ({len(df):,} rows)")
     return df
 
 
-def main() -> None:
+def write_batches_to_zarr(batches: Iterator[pd.DataFrame], zarr_file: str, rename_dict: Dict[str, str],
+                          dtype_dict: Dict[str, str], family: str, filename: str,
+                          output_format: str = 'zarr') -> Tuple[ZarrTableWriter, int, list]:
+    """
+    Process each TSV batch and append it to a new Zarr store, writing one batch while the next is read.
+
+    Args:
+        batches (Iterator[pd.DataFrame]): Batches read from the TSV.
+        zarr_file (str): Output Zarr store (or Parquet file) path (overwritten).
+        rename_dict (Dict[str, str]): Column rename mapping (may be empty).
+        dtype_dict (Dict[str, str]): Column data types (empty to skip type conversion).
+        family (str): Family name for the 'family' column.
+        filename (str): Source filename for the 'filename' column.
+        output_format (str): Key of TABLE_WRITERS selecting the output writer.
+
+    Returns:
+        Tuple[ZarrTableWriter, int, list]: Writer (not yet closed), number of TSV columns,
+        and the written column names.
+    """
+    writer = TABLE_WRITERS[output_format](zarr_file)
+    original_columns = final_columns = None
+
+    def finish_write(batch_number, future):
+        future.result()
+        print(f"  Batch {batch_number}: wrote rows up to {writer.nrows:,}")
+
+    # Each batch is compressed and appended on a worker thread while the next one is read
+    # and converted (Blosc and the Arrow reader release the GIL). A single worker keeps the
+    # appends in order, and at most two batches are in memory at once
+    pending = None
+    try:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            for i, df in enumerate(batches):
+                if original_columns is None:
+                    original_columns = df.shape[1]
+                    print(f"Original data columns: {original_columns}")
+                df = process_chunk(df, rename_dict, dtype_dict, family, filename, verbose=(i == 0))
+                final_columns = df.columns.to_list()
+                if pending is not None:
+                    finish_write(*pending)
+                pending = (i + 1, pool.submit(writer.append, df))
+            if pending is not None:
+                finish_write(*pending)
+    except BaseException:
+        # Release the partial output (e.g. before the C parser fallback rewrites it)
+        writer.abort()
+        raise
+    return writer, original_columns, final_columns
+
+
+def process_one(tsv_path: str, args: argparse.Namespace) -> None:
     """
-    Main function to preprocess TSV file and convert to Zarr format.
+    Preprocess one TSV file and convert it to Zarr (or Parquet) format.
 
     Process:
-        1. Parse command line arguments
-        2. Read TSV file
+        1. Skip if the output is up to date, unless --force
+        2. Read TSV file in batches of --chunk_rows rows (pyarrow, C parser as fallback)
         3. Apply custom renaming if provided
         4. Apply data types from dtype file
         5. Add family and filename columns
-        6. Convert to Zarr format
+        6. Append each batch to the Zarr store (or Parquet file with --format parquet)
+
+    Args:
+        tsv_path (str): Path to the TSV file.
+        args (argparse.Namespace): Parsed command line arguments.
     """
-    args = arg_parser()
-    family, filename = get_family_and_filename(args.input)
+    family, filename = get_family_and_filename(tsv_path)
+    output_dir = args.output if args.output is not None else os.path.dirname(tsv_path)
+    output_file = os.path.join(output_dir, filename.replace('.tsv', f'.{args.format}'))
+
+    # Re-runs (e.g. a workflow re-invoking every family) skip stores that are already current
+    source_files = [tsv_path] + [path for path in (args.rename_map, None if args.skip_dtypes else args.dtype_file)
+                                 if path and os.path.exists(path)]
+    if not args.force and is_output_up_to_date(output_file, source_files):
+        print(f"✓ {args.format.capitalize()} file is up to date, skipping: {output_file} (use --force to rebuild)")
+        return
+
     rename_dict = load_rename_map(args.rename_map)
+    dtype_dict = {} if args.skip_dtypes else load_dtype_mapping(args.dtype_file)
+
+    string_columns = get_string_read_columns(dtype_dict, rename_dict)
 
-    print(f"Reading TSV file: {args.input}")
+    print(f"Reading TSV file: {tsv_path}")
 
-    # Read TSV file
-    df = pd.read_csv(args.input, sep='\t', header=0, low_memory=False)
-    original_shape = df.shape
+    # Stream the TSV with the Arrow reader; if a later block does not fit the column types
+    # inferred from the first one (or rows are ragged), redo the file with the C parser
+    try:
+        writer, original_columns, final_columns = write_batches_to_zarr(
+            iter_arrow_tsv_chunks(tsv_path, args.chunk_rows, string_columns), output_file, rename_dict, dtype_dict, family, filename,
+            args.format)
+    except pa.ArrowInvalid as e:
+        print(f"Warning: pyarrow could not parse {tsv_path} ({e}); falling back to the C parser")
+        writer, original_columns, final_columns = write_batches_to_zarr(
+            iter_tsv_chunks(tsv_path, args.chunk_rows, string_columns), output_file, rename_dict, dtype_dict, family, filename,
+            args.format)
+
+    original_shape = (writer.nrows, original_columns)
+    final_shape = (writer.nrows, len(final_columns))
     print(f"Original data shape: {original_shape}")
+    print(f"Final data shape: {final_shape}")
 
-    # Apply custom column renaming if provided
-    if rename_dict:
-        df.rename(columns=rename_dict, inplace=True)
-        print(f"Applied {len(rename_dict)} column renames")
+    writer.close(attrs={
+        'column_order': final_columns,
+        'original_shape': original_shape,
+        'final_shape': final_shape,
+        'family': family,
+        'source_file': tsv_path,
+    })
 
-    # Apply data types if not skipped
-    if not args.skip_dtypes:
-        dtype_dict = load_dtype_mapping(args.dtype_file)
-        if dtype_dict:
-            print("Applying data types...")
-            df = apply_dtypes_to_dataframe(df, dtype_dict)
+    print("\n✓ Preprocessing complete!")
+    print(f"✓ {args.format.capitalize()} file saved to: {output_file}")
 
-            # Report memory usage improvement
-            print("Data types applied. Checking memory usage...")
-            memory_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
-            print(f"DataFrame memory usage: {memory_mb:.1f} MB")
+    # Report final statistics
+    print("\n📊 PROCESSING SUMMARY:")
+    print(f"   Input file: {tsv_path}")
+    print(f"   Output file: {output_file}")
+    print(f"   Rows: {final_shape[0]:,}")
+    print(f"   Columns: {final_shape[1]:,}")
+    if dtype_dict:
+        print(f"   Data types applied: {len([c for c in dtype_dict.keys() if c in final_columns])}")
 
-    # Add family and filename columns at the beginning
-    df.insert(0, 'family', family)
-    df.insert(1, 'filename', filename)
 
-    final_shape = df.shape
-    print(f"Final data shape: {final_shape}")
+def main() -> None:
+    """
+    Main function to preprocess TSV files and convert them to Zarr format.
 
-    # Convert to Zarr format
-    try:
-        import xarray as xr
-        df_xr = df.to_xarray()
-        df_xr.attrs['column_order'] = df.columns.to_list()
-        df_xr.attrs['original_shape'] = original_shape
-        df_xr.attrs['final_shape'] = final_shape
-        df_xr.attrs['family'] = family
-        df_xr.attrs['source_file'] = args.input
-
-        zarr_file = os.path.join(args.output, filename.replace('.tsv', '.zarr'))
-        df_xr.to_zarr(zarr_file, mode='w')
-
-        print("\n✓ Preprocessing complete!")
-        print(f"✓ Zarr file saved to: {zarr_file}")
-
-        # Report final statistics
-        print("\n📊 PROCESSING SUMMARY:")
-        print(f"   Input file: {args.input}")
-        print(f"   Output file: {zarr_file}")
-        print(f"   Rows: {final_shape[0]:,}")
-        print(f"   Columns: {final_shape[1]:,}")
-        if not args.skip_dtypes and dtype_dict:
-            print(f"   Data types applied: {len([c for c in dtype_dict.keys() if c in df.columns])}")
-
-    except ImportError:
-        print('ERROR: xarray is required for Zarr conversion. Install with: pip install xarray zarr')
+    A single --input is converted in this process. With --inputs the files are independent,
+    so up to --jobs of them are converted at once, each in its own process.
+    """
+    args = arg_parser()
+    if args.input:
+        process_one(args.input, args)
         return
 
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(process_one, tsv_path, args): tsv_path for tsv_path in args.inputs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Failed to convert {futures[future]}: {e}")
+                failed.append(futures[future])
+
+    print(f"\n✓ Converted {len(args.inputs) - len(failed)} of {len(args.inputs)} TSV files")
+    if failed:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
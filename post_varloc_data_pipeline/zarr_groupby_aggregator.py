@@ -19,19 +19,114 @@ Optimized for SLURM environments with automatic multi-core processing.
 """
 
 import argparse
+import os
 import sys
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Set
+from typing import Iterator, List, Set
+import numpy as np
 import pandas as pd
 import xarray as xr
 from dask.distributed import Client
 
+# Add parent directory to path to access the package modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from post_varloc_data_pipeline import filter_kernel
+from post_varloc_data_pipeline.tsv_utils import write_tsv
+from post_varloc_data_pipeline.zarr_utils import dataframe_to_dataset, dataset_to_dataframe, get_directory_size, group_codes, write_dataset_to_zarr
+
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore', message='.*vlen-utf8.*')
 warnings.filterwarnings('ignore', message='.*StringDType.*')
 warnings.filterwarnings('ignore', message='.*Consolidated metadata.*')
 
+# If numba is installed, JIT-compile the per-group distinct-value scan used by the
+# cross-file aggregation; otherwise pandas calls the aggregation function once per group.
+# The kernel is called once per column from the main thread over all groups, so the groups
+# are spread over numba's own thread pool with prange.
+try:
+    from numba import njit, prange
+
+    # Groups up to this size are deduplicated by comparing against the values kept so far;
+    # larger ones (a variant seen in many files) sort their codes instead
+    SMALL_GROUP_ROWS = 32
+
+    @njit(nogil=True, cache=True)
+    def _distinct_in_order(values, out):
+        """Write the distinct non-negative values of values to out in order of first appearance; return their number."""
+        n = 0
+        if len(values) <= SMALL_GROUP_ROWS:
+            for v in values:
+                if v < 0:
+                    continue
+                seen = False
+                for j in range(n):
+                    if out[j] == v:
+                        seen = True
+                        break
+                if not seen:
+                    out[n] = v
+                    n += 1
+            return n
+        # A stable sort puts each value's first occurrence at the start of its run
+        idx = np.argsort(values, kind='mergesort')
+        first = np.zeros(len(values), dtype=np.bool_)
+        for j in range(len(idx)):
+            if j == 0 or values[idx[j]] != values[idx[j - 1]]:
+                first[idx[j]] = True
+        for j in range(len(values)):
+            if first[j] and values[j] >= 0:
+                out[n] = values[j]
+                n += 1
+        return n
+
+    @njit(parallel=True, cache=True)
+    def _group_distinct_kernel(group_ids, codes, n_groups, n_codes):
+        """
+        List each group's distinct value codes in order of first appearance.
+
+        Rows are counting-sorted by group (stable, so they keep their row order inside a
+        group), then every group is deduplicated independently in parallel. Rows with
+        group -1 or code -1 (missing value) are skipped.
+
+        Returns:
+            (counts, distinct): distinct codes per group, and the codes of all groups
+            concatenated in group order
+        """
+        group_starts = np.zeros(n_groups + 1, dtype=np.int64)
+        for g in group_ids:
+            if g >= 0:
+                group_starts[g + 1] += 1
+        group_starts = np.cumsum(group_starts)
+
+        fill = group_starts[:-1].copy()
+        grouped_codes = np.empty(group_starts[-1], dtype=np.int64)
+        for i in range(len(group_ids)):
+            g = group_ids[i]
+            if g >= 0:
+                grouped_codes[fill[g]] = codes[i]
+                fill[g] += 1
+
+        # Each group's distinct codes fit in its own slice, so groups are written without sharing state
+        counts = np.zeros(n_groups, dtype=np.int64)
+        scratch = np.empty(len(grouped_codes), dtype=np.int64)
+        for g in prange(n_groups):
+            start = group_starts[g]
+            end = group_starts[g + 1]
+            counts[g] = _distinct_in_order(grouped_codes[start:end], scratch[start:end])
+
+        offsets = np.zeros(n_groups + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+        distinct = np.empty(offsets[-1], dtype=np.int64)
+        for g in prange(n_groups):
+            distinct[offsets[g]:offsets[g + 1]] = scratch[group_starts[g]:group_starts[g] + counts[g]]
+        return counts, distinct
+
+    NUMBA_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMBA_AVAILABLE = False
+
 
 class ZarrCrossFileAggregator:
     """
@@ -62,10 +157,12 @@ class ZarrCrossFileAggregator:
     def load_gene_filter(self, gene_filter_file: str) -> None:
         """Load gene symbols from TSV file for filtering."""
         try:
-            gene_df = pd.read_csv(gene_filter_file, sep='\t')
-            if 'Gene Symbol' not in gene_df.columns:
-                raise ValueError(f"Gene filter file must contain a 'Gene Symbol' column. Found columns: {list(gene_df.columns)}")
-            self.gene_filter_symbols = set(gene_df['Gene Symbol'].dropna().unique())
+            available_columns = list(pd.read_csv(gene_filter_file, sep='\t', nrows=0).columns)
+            if 'Gene Symbol' not in available_columns:
+                raise ValueError(f"Gene filter file must contain a 'Gene Symbol' column. Found columns: {available_columns}")
+            gene_df = pd.read_csv(gene_filter_file, sep='\t', usecols=['Gene Symbol'],
+                                  engine='pyarrow', dtype_backend='pyarrow')
+            self.gene_filter_symbols = frozenset(gene_df['Gene Symbol'].dropna().unique())
             print(f"✓ Loaded {len(self.gene_filter_symbols)} gene symbols for filtering")
             print(f"  Example genes: {list(self.gene_filter_symbols)[:5]}")
         except Exception as e:
@@ -80,14 +177,9 @@ class ZarrCrossFileAggregator:
             print("Warning: ANN['SYMBOL'] column not found in data. Skipping gene filtering.")
             return df
         original_rows = len(df)
-        def check_gene_match(symbols_str):
-            if pd.isna(symbols_str) or symbols_str == '' or symbols_str == '.':
-                return False
-            symbols = str(symbols_str).replace(';', '|').replace(',', '|').replace('&', '|').split('|')
-            symbols = [s.strip() for s in symbols if s.strip()]
-            return any(symbol in self.gene_filter_symbols for symbol in symbols)
-        mask = df["ANN['SYMBOL']"].apply(check_gene_match)
-        filtered_df = df[mask].copy()
+        mask = filter_kernel.delimited_match_mask(df["ANN['SYMBOL']"], self.gene_filter_symbols)
+        # Boolean selection already returns a new frame; no extra copy needed
+        filtered_df = df[mask]
         filtered_rows = len(filtered_df)
         removed_rows = original_rows - filtered_rows
         print("🧬 GENE FILTERING APPLIED:")
@@ -157,22 +249,24 @@ class ZarrCrossFileAggregator:
         valid_files = []
 
         for zarr_file in zarr_files:
-            zarr_path = Path(zarr_file)
-            if zarr_path.exists() and zarr_path.is_dir():
+            # is_dir() is a single stat and is False for missing paths
+            if Path(zarr_file).is_dir():
                 try:
-                    # Quick check that we can open the zarr file
-                    ds = xr.open_zarr(zarr_file)
+                    # Quick check from one directory listing instead of opening the Dataset:
+                    # a Zarr group has a metadata file and one sub-directory per variable
+                    with os.scandir(zarr_file) as entries:
+                        entry_names = {entry.name for entry in entries}
+                    if not entry_names & {'zarr.json', '.zgroup'}:
+                        raise ValueError("no Zarr group metadata (zarr.json or .zgroup) found")
 
                     # Check if it looks like a processed file (has FILENAME column)
-                    available_columns = list(ds.data_vars.keys()) + list(ds.coords.keys())
-                    if 'FILENAME' in available_columns:
+                    if 'FILENAME' in entry_names:
                         print(f"✓ Validated processed file: {zarr_file}")
                         valid_files.append(zarr_file)
                     else:
                         print(f"⚠ Warning: {zarr_file} doesn't appear to be processed (missing FILENAME column)")
                         valid_files.append(zarr_file)  # Include anyway
 
-                    ds.close()
                 except Exception as e:
                     print(f"✗ Cannot read Zarr file {zarr_file}: {e}")
             else:
@@ -184,6 +278,98 @@ class ZarrCrossFileAggregator:
 
         return valid_files
 
+    def get_columns_to_load(self, available_columns: List[str], keep_all_columns: bool = False,
+                            row_count_only: bool = False) -> List[str]:
+        """
+        Select the Zarr variables a file must be decoded for, so unused columns are never read.
+
+        Args:
+            available_columns: Data variables present in the Zarr file
+            keep_all_columns: Whether every column is kept in the output
+            row_count_only: Whether only the pivot columns (and ROW_COUNT) are produced
+
+        Returns:
+            Column names to load, in file order
+        """
+        if keep_all_columns:
+            return list(available_columns)
+
+        # Pivot/genomic coordinates (validation), the gene filter column, and family tracking
+        needed = set(self.pivot_columns) | {'CHROM', 'POS', 'REF', 'ALT', "ANN['SYMBOL']", 'family'}
+        if not row_count_only:
+            needed.update(self.target_ann_columns)
+            needed.add('SAMPLE')
+
+        return [col for col in available_columns
+                if col in needed
+                or (not row_count_only and (col.startswith('INFO[') or col.startswith('AF_')
+                                            or (col.startswith('FORMAT[') and "'AF'" in col)))]
+
+    def iter_processed_dataframes(self, processed_files: List[str], keep_all_columns: bool = False,
+                                  row_count_only: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Load processed Zarr files as DataFrames on a thread pool, yielding them in input order.
+
+        Files are independent and Zarr decompression releases the GIL, so later files are
+        read while earlier ones are being validated.
+
+        Args:
+            processed_files: List of processed zarr file paths
+            keep_all_columns: Whether every column is kept in the output
+            row_count_only: Whether only the pivot columns (and ROW_COUNT) are produced
+
+        Yields:
+            One DataFrame per file, with only the columns this aggregation mode uses
+        """
+        def load_file(zarr_file):
+            with xr.open_zarr(zarr_file) as ds:
+                # Decode only the columns this aggregation mode can use
+                columns_to_load = self.get_columns_to_load(list(ds.data_vars), keep_all_columns, row_count_only)
+                df = dataset_to_dataframe(ds[columns_to_load])
+                # Row order recorded by zarr_pivot_creator.py, used to skip the uniqueness groupby
+                if 'sorted_by' in ds.attrs:
+                    df.attrs['sorted_by'] = list(ds.attrs['sorted_by'])
+                return df
+
+        max_workers = max(1, min(len(processed_files), os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(load_file, processed_files)
+
+    def coordinates_known_unique(self, df: pd.DataFrame, coords: List[str]) -> bool:
+        """
+        Check genomic coordinate uniqueness from the file's recorded row order, without a groupby.
+
+        zarr_pivot_creator.py writes rows sorted by, and unique on, its group keys and records
+        them in the 'sorted_by' attribute. If every key is one of coords, the rows are unique on
+        coords by construction. If coords follow leading keys that hold a single value in the
+        file (e.g. one SAMPLE), equal coordinates would be adjacent, so comparing each row with
+        the previous one is enough.
+
+        Args:
+            df: DataFrame loaded from one processed Zarr file
+            coords: Genomic coordinate columns that must be unique
+
+        Returns:
+            True if the rows are known to be unique on coords, False if a full check is needed
+        """
+        sorted_by = list(df.attrs.get('sorted_by', []))
+        if not sorted_by:
+            return False
+        if set(sorted_by) <= set(coords):
+            return True
+
+        # Skip leading sort keys that are constant in this file
+        while (sorted_by and sorted_by[0] not in coords and sorted_by[0] in df.columns
+               and df[sorted_by[0]].nunique(dropna=False) <= 1):
+            sorted_by = sorted_by[1:]
+        if set(sorted_by[:len(coords)]) != set(coords):
+            return False
+
+        same_as_previous = np.ones(max(len(df) - 1, 0), dtype=bool)
+        for col in coords:
+            same_as_previous &= df[col].eq(df[col].shift()).to_numpy(dtype=bool, na_value=False)[1:]
+        return not same_as_previous.any()
+
     def combine_processed_zarr_files(self, processed_files: List[str], output_path: str, export_tsv: bool = False, keep_all_columns: bool = False, row_count_only: bool = False, row_count_cutoff: int = None):
         """
         Step 2: Combine processed zarr files with cross-file pivot.
@@ -212,11 +398,8 @@ class ZarrCrossFileAggregator:
             all_dfs = []
             file_families = {}
 
-            for file_idx, zarr_file in enumerate(processed_files, 1):
-                ds = xr.open_zarr(zarr_file)
-                df = ds.to_dataframe().reset_index()
-                ds.close()
-
+            loaded_dfs = self.iter_processed_dataframes(processed_files, keep_all_columns, row_count_only)
+            for file_idx, (zarr_file, df) in enumerate(zip(processed_files, loaded_dfs), 1):
                 print(f"Processing file {file_idx}/{len(processed_files)}: {zarr_file}")
 
                 # VALIDATION: Check that each file has unique genomic coordinates
@@ -227,10 +410,17 @@ class ZarrCrossFileAggregator:
                 if len(available_genomic_coords) < 4:
                     print(f"  Warning: Missing genomic coordinate columns in {zarr_file}")
                     print(f"  Available: {available_genomic_coords}, Expected: {genomic_coords}")
+                elif self.coordinates_known_unique(df, available_genomic_coords):
+                    print(f"  ✅ Validation passed: All {len(df):,} rows have unique genomic coordinates "
+                          f"(file sorted by {df.attrs['sorted_by']})")
                 else:
-                    # Group by genomic coordinates and count rows per group
-                    validation_groups = df.groupby(available_genomic_coords).size()
-                    duplicate_groups = validation_groups[validation_groups > 1]
+                    # Count rows per genomic coordinate combination with factorize + bincount;
+                    # only the rows of duplicated combinations go through a groupby, for the report
+                    coord_codes = group_codes(df, available_genomic_coords)
+                    coord_counts = np.bincount(coord_codes[coord_codes >= 0])
+                    # Rows with a missing coordinate (code -1) read the appended zero count
+                    duplicate_rows = np.append(coord_counts, 0)[coord_codes] > 1
+                    duplicate_groups = df[duplicate_rows].groupby(available_genomic_coords).size()
 
                     if len(duplicate_groups) > 0:
                         print(f"  ❌ VALIDATION FAILED for file {zarr_file}")
@@ -256,7 +446,7 @@ class ZarrCrossFileAggregator:
 
                         raise ValueError(error_msg)
                     else:
-                        total_variants = len(validation_groups)
+                        total_variants = len(coord_counts)
                         print(f"  ✅ Validation passed: All {total_variants:,} genomic coordinate combinations are unique")
 
                 # Apply gene filter if specified
@@ -305,100 +495,155 @@ class ZarrCrossFileAggregator:
 
                 all_dfs.append(df)
 
-            # Combine all dataframes
+            # Combine all dataframes, then drop the per-file frames so only one copy of the
+            # data is alive while the columns are selected and grouped
             combined_df = pd.concat(all_dfs, ignore_index=True)
+            all_dfs.clear()
             print(f"Combined dataframe shape: {combined_df.shape}")
             print(f"Family mapping: {file_families}")
 
             available_columns = combined_df.columns.tolist()
+            # Sets for the membership tests below; wide inputs have thousands of columns
+            available_set = set(available_columns)
+            pivot_set = set(self.pivot_columns)
             if row_count_only:
                 print("Performing minimal pivot with only ROW_COUNT.")
                 # Only keep pivot columns for minimal output
-                columns_to_keep = [col for col in self.pivot_columns if col in available_columns]
-                filtered_df = combined_df[columns_to_keep].copy()
+                columns_to_keep = [col for col in self.pivot_columns if col in available_set]
+                filtered_df = combined_df[columns_to_keep]
                 agg_columns = []  # No aggregation columns, just count rows
                 print(f"  Pivot columns: {self.pivot_columns}")
                 print("  No data columns will be aggregated - only ROW_COUNT will be included")
             elif keep_all_columns:
                 print("Keeping all columns from input files in the output.")
-                filtered_df = combined_df.copy()
-                agg_columns = [col for col in available_columns if col not in self.pivot_columns]
+                filtered_df = combined_df
+                agg_columns = [col for col in available_columns if col not in pivot_set]
                 print(f"  Pivot columns: {self.pivot_columns}")
                 print(f"  Aggregation columns: {agg_columns}")
             else:
                 # 1. Always include pivot columns
-                columns_to_keep = [col for col in self.pivot_columns if col in available_columns]
+                columns_to_keep = [col for col in self.pivot_columns if col in available_set]
 
                 # 2. Include target ANN columns if they exist
                 for ann_col in self.target_ann_columns:
-                    if ann_col in available_columns:
+                    if ann_col in available_set:
                         columns_to_keep.append(ann_col)
                         print(f"  Including ANN column: {ann_col}")
                     else:
                         print(f"  ANN column not found: {ann_col}")
 
+                # 3-4. Classify INFO and family-specific AF columns in one pass over the columns
+                info_columns = []
+                family_af_columns = []
+                for col in available_columns:
+                    if col.startswith("INFO["):
+                        info_columns.append(col)
+                    elif col.startswith('AF_'):
+                        family_af_columns.append(col)
+
                 # 3. Include all INFO columns
-                info_columns = [col for col in available_columns if col.startswith("INFO[")]
                 columns_to_keep.extend(info_columns)
                 print(f"  Including {len(info_columns)} INFO columns")
 
-                # 4. Find family-specific AF columns
-                family_af_columns = [col for col in available_columns if col.startswith('AF_')]
+                # 4. Include family-specific AF columns
                 columns_to_keep.extend(family_af_columns)
                 if family_af_columns:
                     print(f"  Including family-specific AF columns: {family_af_columns}")
 
                 # 5. Include family and sample columns if they exist
                 for meta_col in ['family', 'SAMPLE']:
-                    if meta_col in available_columns:
+                    if meta_col in available_set:
                         columns_to_keep.append(meta_col)
 
                 # Remove duplicates while preserving order
                 columns_to_keep = list(dict.fromkeys(columns_to_keep))
 
                 # Filter dataframe to only keep selected columns
-                filtered_df = combined_df[columns_to_keep].copy()
+                filtered_df = combined_df[columns_to_keep]
                 print(f"Filtered to {len(columns_to_keep)} columns: {columns_to_keep}")
 
                 # Determine aggregation columns (everything except pivot columns)
-                agg_columns = [col for col in columns_to_keep if col not in self.pivot_columns]
+                agg_columns = [col for col in columns_to_keep if col not in pivot_set]
 
                 print(f"  Pivot columns: {self.pivot_columns}")
                 print(f"  Aggregation columns: {agg_columns}")
 
-            # Group by pivot columns
-            grouped = filtered_df.groupby(self.pivot_columns)
+            # Group by pivot columns; string keys (CHROM, REF, ALT) are grouped as categoricals
+            # so the groupby hashes integer codes, not Python strings
+            string_keys = [col for col in self.pivot_columns if pd.api.types.is_string_dtype(filtered_df[col].dtype)]
+            filtered_df = filtered_df.assign(**{col: filtered_df[col].astype('category') for col in string_keys})
+            # Integer keys (POS) are downcast to the smallest integer type that holds them, which
+            # halves the bytes hashed per row; the original dtypes are restored on the result
+            int_key_dtypes = {col: filtered_df[col].dtype for col in self.pivot_columns
+                              if pd.api.types.is_integer_dtype(filtered_df[col].dtype)}
+            filtered_df = filtered_df.assign(**{col: pd.to_numeric(filtered_df[col], downcast='integer')
+                                                for col in int_key_dtypes})
+            grouped = filtered_df.groupby(self.pivot_columns, observed=True)
+
+            # Apply row count cutoff filtering if specified. Whole variants are dropped, so the
+            # rows of common variants are removed in one gather before any aggregation runs
+            if row_count_cutoff is not None:
+                group_sizes = grouped.size().to_numpy()
+                # Rows with a missing pivot value belong to no group (ngroup gives them NaN)
+                group_ids = grouped.ngroup().to_numpy(dtype=np.int64, na_value=-1)
+                keep_groups = group_sizes < row_count_cutoff
+                keep_rows = (group_ids >= 0) & keep_groups[group_ids]
+                original_count = len(group_sizes)
+                filtered_count = int(keep_groups.sum())
+                removed_count = original_count - filtered_count
+                print(f"Row count cutoff applied: Removed {removed_count:,} variants with ROW_COUNT >= {row_count_cutoff}")
+                print(f"  Before cutoff: {original_count:,} variants")
+                print(f"  After cutoff: {filtered_count:,} variants ({(filtered_count/original_count)*100:.1f}% retained)")
+
+                filtered_df = filtered_df[keep_rows]
+                grouped = filtered_df.groupby(self.pivot_columns, observed=True)
+
+            if agg_columns and NUMBA_AVAILABLE:
+                # Aggregate every column over all groups at once with the distinct-value kernel
+                group_ids = grouped.ngroup().to_numpy(dtype=np.int64, na_value=-1)
+                group_sizes = grouped.size()
+                result_df = group_sizes.index.to_frame(index=False)
+                for col in agg_columns:
+                    result_df[col] = self.aggregate_grouped_column(
+                        filtered_df[col], group_ids, len(result_df), family_af=col.startswith('AF_'))
 
-            # Prepare aggregation dictionary
-            if agg_columns:
+                # Add row count showing number of rows combined per variant
+                result_df['ROW_COUNT'] = group_sizes.to_numpy()
+            elif agg_columns:
+                # Prepare aggregation dictionary
                 agg_dict = {}
                 for col in agg_columns:
                     if col.startswith('AF_'):
-                        # For family-specific AF columns, use family-specific aggregation
-                        agg_dict[col] = self.aggregate_family_af_values
+                        # For family-specific AF columns, keep the first non-null value (same as
+                        # aggregate_family_af_values) with the built-in aggregation, not a Python call per group
+                        agg_dict[col] = 'first'
                     else:
                         # For other columns, use standard aggregation
                         agg_dict[col] = self.aggregate_cross_file_values
 
                 # Perform aggregation
                 result_df = grouped.agg(agg_dict).reset_index()
-            else:
-                # No aggregation columns, just get unique combinations of pivot columns
-                result_df = filtered_df.drop_duplicates(subset=self.pivot_columns).reset_index(drop=True)
-                result_df = result_df[self.pivot_columns].copy()
 
-            # Add row count showing number of rows combined per variant
-            result_df['ROW_COUNT'] = grouped.size().values
+                # Different values for same family - potential data issue. Count them with the
+                # built-in nunique and only revisit the variants that have them
+                af_agg_columns = [col for col in agg_columns if col.startswith('AF_')]
+                if af_agg_columns:
+                    af_counts = grouped[af_agg_columns].nunique()
+                    for af_col in af_agg_columns:
+                        for name in af_counts.index[af_counts[af_col].to_numpy() > 1]:
+                            values = grouped.get_group(name)[af_col].dropna().unique()
+                            print(f"Warning: Multiple different AF values for same family: {values.tolist()}")
+
+                # Add row count showing number of rows combined per variant
+                result_df['ROW_COUNT'] = grouped.size().to_numpy()
+            else:
+                # No aggregation columns, just the unique pivot column combinations with their
+                # row counts (in the same group order as the aggregated path)
+                result_df = grouped.size().reset_index(name='ROW_COUNT')
 
-            # Apply row count cutoff filtering if specified
-            if row_count_cutoff is not None:
-                original_count = len(result_df)
-                result_df = result_df[result_df['ROW_COUNT'] < row_count_cutoff].copy()
-                filtered_count = len(result_df)
-                removed_count = original_count - filtered_count
-                print(f"Row count cutoff applied: Removed {removed_count:,} variants with ROW_COUNT >= {row_count_cutoff}")
-                print(f"  Before cutoff: {original_count:,} variants")
-                print(f"  After cutoff: {filtered_count:,} variants ({(filtered_count/original_count)*100:.1f}% retained)")
+            # Turn the categorical group keys back into plain columns of their values' dtype
+            result_df = result_df.astype({col: result_df[col].cat.categories.dtype for col in string_keys})
+            result_df = result_df.astype(int_key_dtypes)
 
             print(f"Final result shape: {result_df.shape}")
 
@@ -435,15 +680,15 @@ class ZarrCrossFileAggregator:
         # Validate that each row has at most one non-null family AF value per variant
         af_columns_in_df = [col for col in combined_df.columns if col.startswith('AF_')]
 
-        # Group by genomic coordinates and check AF distribution
-        grouped = combined_df.groupby(self.pivot_columns)
-        for name, group in grouped:
-            af_counts = {}
+        # Count distinct AF values per variant for every AF column in one groupby pass,
+        # then only revisit the (rare) variants that violate the one-value rule
+        if af_columns_in_df:
+            grouped = combined_df.groupby(self.pivot_columns, sort=False, observed=True)
+            af_counts = grouped[af_columns_in_df].nunique()
             for af_col in af_columns_in_df:
-                non_null_count = group[af_col].dropna().nunique()
-                if non_null_count > 1:
-                    print(f"Warning: Variant {name} has multiple AF values in {af_col}: {group[af_col].dropna().unique()}")
-                af_counts[af_col] = non_null_count
+                for name in af_counts.index[af_counts[af_col].to_numpy() > 1]:
+                    values = grouped.get_group(name)[af_col].dropna().unique()
+                    print(f"Warning: Variant {name} has multiple AF values in {af_col}: {values}")
 
         return combined_df
 
@@ -547,6 +792,52 @@ class ZarrCrossFileAggregator:
                 return unique_values[0]
             else:
                 return unique_values
+
+    def aggregate_grouped_column(self, series: pd.Series, group_ids: np.ndarray, n_groups: int,
+                                 family_af: bool = False) -> pd.Series:
+        """
+        Aggregate one column over all groups at once, with the same result as
+        aggregate_cross_file_values (or aggregate_family_af_values for family AF columns).
+
+        Values are factorized to integer codes and _group_distinct_kernel lists the distinct
+        codes of every group in one pass, so Python only touches groups with several values.
+
+        Args:
+            series: Column to aggregate, aligned with group_ids
+            group_ids: Group number of each row (-1 for rows outside every group)
+            n_groups: Number of groups
+            family_af: Whether the column is a family-specific AF column
+
+        Returns:
+            Series with one aggregated value per group, in group number order
+        """
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:
+            # Unhashable cells (lists) go through the per-group aggregation function
+            aggregate = self.aggregate_family_af_values if family_af else self.aggregate_cross_file_values
+            in_group = group_ids >= 0
+            return series[in_group].groupby(group_ids[in_group]).agg(aggregate).reset_index(drop=True)
+
+        counts, distinct = _group_distinct_kernel(group_ids, codes.astype(np.int64), n_groups, len(uniques))
+        values = np.asarray(uniques, dtype=object)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        # Single-valued groups (and the first value of family AF groups) are filled directly
+        result = np.full(n_groups, None, dtype=object)
+        has_values = counts > 0
+        result[has_values] = values[distinct[offsets[:-1][has_values]]]
+
+        for group in np.flatnonzero(counts > 1):
+            group_values = values[distinct[offsets[group]:offsets[group + 1]]].tolist()
+            if family_af:
+                # Different values for same family - potential data issue
+                print(f"Warning: Multiple different AF values for same family: {group_values}")
+            else:
+                result[group] = group_values
+
+        return pd.Series(result, dtype=object).infer_objects()
+
     def process_zarr_files(self, processed_zarr_files: List[str], output_path: str, export_tsv: bool = False, row_count_only: bool = False, row_count_cutoff: int = None):
         """
         Main processing function for cross-file aggregation.
@@ -600,17 +891,14 @@ class ZarrCrossFileAggregator:
 
         try:
             # Prepare DataFrame for xarray conversion
-            df_clean = result_df.copy()
-
-            # Handle mixed types and ensure compatibility with xarray
-            for col in df_clean.columns:
-                if df_clean[col].dtype == 'object':
-                    # Convert object columns to string to avoid xarray issues
-                    df_clean[col] = df_clean[col].astype(str)
-                    df_clean[col] = df_clean[col].replace('nan', None)
+            # Convert object columns to string to avoid xarray issues; assign() only
+            # allocates the converted columns instead of copying the whole frame
+            object_cols = [col for col in result_df.columns if result_df[col].dtype == 'object']
+            df_clean = result_df.assign(**{col: result_df[col].astype(str).replace('nan', None)
+                                           for col in object_cols})
 
             # Convert to xarray Dataset
-            ds = df_clean.to_xarray()
+            ds = dataframe_to_dataset(df_clean)
 
             # Add metadata about the aggregation process
             ds.attrs['processing_type'] = 'cross_file_aggregated'
@@ -619,18 +907,18 @@ class ZarrCrossFileAggregator:
             ds.attrs['total_variants'] = len(result_df)
             ds.attrs['aggregation_note'] = 'Variants aggregated across multiple files by genomic coordinates'
 
-            # Save as Zarr
-            ds.to_zarr(output_path, mode='w')
+            # Save as Zarr (explicit row chunks, Blosc/Zstd compression)
+            write_dataset_to_zarr(ds, output_path)
             print(f"✓ Results saved to Zarr: {output_path}")
 
             # Calculate Zarr size
-            zarr_size_mb = sum(f.stat().st_size for f in output_path.rglob('*') if f.is_file()) / (1024 * 1024)
+            zarr_size_mb = get_directory_size(output_path) / (1024 * 1024)
             print(f"  Zarr file size: {zarr_size_mb:.2f} MB")
 
             # Export TSV if requested
             if export_tsv:
                 tsv_path = output_path.with_suffix('.tsv')
-                result_df.to_csv(tsv_path, sep='\t', index=False, na_rep='.')
+                write_tsv(result_df, tsv_path)
                 print(f"✓ Also exported TSV: {tsv_path}")
 
                 tsv_size_mb = tsv_path.stat().st_size / (1024 * 1024)
@@ -18,8 +18,11 @@ GENE FILTERING:
 """
 
 import argparse
+import json
+import numpy as np
 import pandas as pd
 import xarray as xr
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Any
 import warnings
@@ -28,7 +31,10 @@ import os
 
 # Add parent directory to path to access the config module
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from post_varloc_data_pipeline.config import parse_yaml
+from post_varloc_data_pipeline import filter_kernel
+from post_varloc_data_pipeline.config import initialize_config, parse_yaml
+from post_varloc_data_pipeline.tsv_utils import write_tsv
+from post_varloc_data_pipeline.zarr_utils import dataframe_to_dataset, dataset_to_dataframe, get_directory_size, write_dataset_to_zarr
 
 # Suppress Zarr warnings
 warnings.filterwarnings('ignore', message='.*vlen-utf8.*')
@@ -58,15 +64,18 @@ class ZarrFilterPivotCreator:
     def load_gene_filter(self, gene_filter_file: str) -> None:
         """Load gene symbols from TSV file for filtering."""
         try:
-            # Read the gene filter file
-            gene_df = pd.read_csv(gene_filter_file, sep='\t')
+            # Read the header first, then only the Gene Symbol column with the pyarrow parser
+            available_columns = list(pd.read_csv(gene_filter_file, sep='\t', nrows=0).columns)
 
             # Check if Gene Symbol column exists
-            if 'Gene Symbol' not in gene_df.columns:
-                raise ValueError(f"Gene filter file must contain a 'Gene Symbol' column. Found columns: {list(gene_df.columns)}")
+            if 'Gene Symbol' not in available_columns:
+                raise ValueError(f"Gene filter file must contain a 'Gene Symbol' column. Found columns: {available_columns}")
+
+            gene_df = pd.read_csv(gene_filter_file, sep='\t', usecols=['Gene Symbol'],
+                                  engine='pyarrow', dtype_backend='pyarrow')
 
             # Extract unique gene symbols and remove any null values
-            self.gene_filter_symbols = set(gene_df['Gene Symbol'].dropna().unique())
+            self.gene_filter_symbols = frozenset(gene_df['Gene Symbol'].dropna().unique())
 
             print(f"✓ Loaded {len(self.gene_filter_symbols)} gene symbols for filtering")
             print(f"  Example genes: {list(self.gene_filter_symbols)[:5]}")
@@ -75,6 +84,19 @@ class ZarrFilterPivotCreator:
             print(f"Error loading gene filter file '{gene_filter_file}': {e}")
             raise
 
+    def compute_gene_mask(self, symbols: pd.Series) -> np.ndarray:
+        """Return a boolean array marking values where any delimited gene symbol is in the filter."""
+        return filter_kernel.delimited_match_mask(symbols, self.gene_filter_symbols)
+
+    def report_gene_filter_results(self, original_rows: int, filtered_rows: int) -> None:
+        """Print a summary of the gene filtering results."""
+        removed_rows = original_rows - filtered_rows
+
+        print("🧬 GENE FILTERING APPLIED:")
+        print(f"   ORIGINAL: {original_rows:,} rows")
+        print(f"   FILTERED: {filtered_rows:,} rows")
+        print(f"   REMOVED:  {removed_rows:,} rows ({(removed_rows/original_rows)*100 if original_rows else 0:.1f}%)")
+
     def apply_gene_filter(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply gene filtering if gene filter is loaded."""
         if self.gene_filter_symbols is None:
@@ -84,32 +106,64 @@ class ZarrFilterPivotCreator:
             print("Warning: ANN['SYMBOL'] column not found in data. Skipping gene filtering.")
             return df
 
-        original_rows = len(df)
+        mask = self.compute_gene_mask(df["ANN['SYMBOL']"])
+        # Boolean selection already returns a new frame; no extra copy needed
+        filtered_df = df[mask]
+        self.report_gene_filter_results(len(df), len(filtered_df))
 
-        # Create a mask for rows where any gene symbol in ANN['SYMBOL'] matches our filter
-        def check_gene_match(symbols_str):
-            if pd.isna(symbols_str) or symbols_str == '' or symbols_str == '.':
-                return False
+        return filtered_df
 
-            # ANN['SYMBOL'] can contain multiple symbols separated by various delimiters
-            # Common delimiters: semicolon, comma, pipe, ampersand
-            symbols = str(symbols_str).replace(';', '|').replace(',', '|').replace('&', '|').split('|')
-            symbols = [s.strip() for s in symbols if s.strip()]
+    def select_gene_filtered_rows(self, ds: xr.Dataset) -> xr.Dataset:
+        """
+        Select the rows of a flat Zarr-backed Dataset whose ANN['SYMBOL'] passes the gene filter.
 
-            # Check if any symbol matches our filter
-            return any(symbol in self.gene_filter_symbols for symbol in symbols)
+        Only ANN['SYMBOL'] is decoded, one Zarr chunk per worker, into a NumPy mask. The
+        result is a single lazy isel gather, so no other column is read until it is computed.
 
-        # Apply the filter
-        mask = df["ANN['SYMBOL']"].apply(check_gene_match)
-        filtered_df = df[mask].copy()
+        Args:
+            ds: 1-D Dataset opened with xr.open_zarr, containing ANN['SYMBOL']
 
-        filtered_rows = len(filtered_df)
-        removed_rows = original_rows - filtered_rows
+        Returns:
+            The selected rows (ds itself if every row passes)
+        """
+        dim = next(iter(ds.dims))
+        symbols = ds["ANN['SYMBOL']"]
+        block_sizes = symbols.chunks[0] if symbols.chunks else (ds.sizes[dim],)
 
-        print("🧬 GENE FILTERING APPLIED:")
-        print(f"   ORIGINAL: {original_rows:,} rows")
-        print(f"   FILTERED: {filtered_rows:,} rows")
-        print(f"   REMOVED:  {removed_rows:,} rows ({(removed_rows/original_rows)*100:.1f}%)")
+        block_starts = np.concatenate(([0], np.cumsum(block_sizes)[:-1]))
+
+        def mask_block(start, size):
+            # Each worker reads its own chunk synchronously, so the thread pool below is the only
+            # source of parallelism (per-call scheduler, since dask.config is process-global)
+            block_symbols = symbols.isel({dim: slice(start, start + size)}).compute(scheduler='synchronous')
+            return self.compute_gene_mask(block_symbols.to_series())
+
+        # Chunks are independent; Zarr decompression and Arrow string ops release the GIL
+        with ThreadPoolExecutor(max_workers=max(1, min(len(block_sizes), os.cpu_count() or 1))) as executor:
+            block_masks = list(executor.map(mask_block, block_starts, block_sizes))
+
+        mask = np.concatenate(block_masks) if block_masks else np.zeros(ds.sizes[dim], dtype=bool)
+        return ds if mask.all() else ds.isel({dim: np.flatnonzero(mask)})
+
+    def load_gene_filtered_dataframe(self, ds: xr.Dataset) -> pd.DataFrame:
+        """
+        Load a Zarr-backed Dataset as a DataFrame, applying the gene filter before loading.
+
+        The gene mask is built from ANN['SYMBOL'] alone (see select_gene_filtered_rows); the
+        remaining columns are then read for the surviving rows only, in one gather.
+
+        Args:
+            ds: Dataset opened with xr.open_zarr
+
+        Returns:
+            DataFrame of the rows passing the gene filter (all rows if no filter is loaded)
+        """
+        if self.gene_filter_symbols is None or "ANN['SYMBOL']" not in ds.data_vars or len(ds.dims) != 1:
+            return self.apply_gene_filter(dataset_to_dataframe(ds))
+
+        dim = next(iter(ds.dims))
+        filtered_df = dataset_to_dataframe(self.select_gene_filtered_rows(ds))
+        self.report_gene_filter_results(ds.sizes[dim], len(filtered_df))
 
         return filtered_df
 
@@ -238,76 +292,129 @@ class ZarrFilterPivotCreator:
 
         return mask
 
-    def create_filtered_pivoted_zarr(self, zarr_path: str, output_path: str = None, remove_validation_errors: bool = False) -> tuple[str, pd.DataFrame]:
-        """Create a filtered and pivoted Zarr file based on configuration criteria."""
-        print(f"Loading Zarr file: {zarr_path}")
+    def get_filter_columns(self, available_columns: List[str], filters: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Return the available columns the configured filters read (matched case-insensitively).
 
-        # Load the Zarr file
-        ds = xr.open_zarr(zarr_path)
-        df = ds.to_dataframe().reset_index()
+        Args:
+            available_columns: Column names present in the data
+            filters: Filters from get_filters()
 
-        # Store original column order to preserve throughout processing
-        original_column_order = df.columns.tolist()
+        Returns:
+            Matching column names, in data order
+        """
+        filter_names = {column.lower() for column in filters}
+        return [col for col in available_columns if col.lower() in filter_names]
 
-        original_rows = len(df)
-        print(f"BEFORE: Original data shape: {df.shape} ({original_rows:,} rows)")
+    def compute_filter_mask(self, df: pd.DataFrame, filters: Dict[str, Dict[str, Any]]) -> np.ndarray:
+        """
+        Evaluate the configured column filters and AND them into one row mask.
 
-        # STEP 0: Apply gene filtering if specified
-        df = self.apply_gene_filter(df)
+        Prints per-filter diagnostics (null/blank counts, sample values, rows remaining).
 
-        # STEP 1: Apply filters
-        filters = self.get_filters()
-        if filters:
-            mask = pd.Series([True] * len(df))
+        Args:
+            df: DataFrame holding (at least) the filtered columns
+            filters: Filters from get_filters()
+
+        Returns:
+            Boolean NumPy array, True for rows passing every filter
+        """
+        # One preallocated boolean array, AND-ed in place by each filter
+        mask = np.ones(len(df), dtype=bool)
 
-            for config_column, filter_def in filters.items():
-                # Find the actual column name (handle case sensitivity)
-                actual_column = None
+        for config_column, filter_def in filters.items():
+            # Find the actual column name (handle case sensitivity)
+            actual_column = None
 
-                # First try exact match
-                if config_column in df.columns:
-                    actual_column = config_column
-                else:
-                    # Try case-insensitive match
-                    for col in df.columns:
-                        if col.lower() == config_column.lower():
-                            actual_column = col
-                            print(f"Info: Found case-insensitive match: '{config_column}' -> '{actual_column}'")
-                            break
+            # First try exact match
+            if config_column in df.columns:
+                actual_column = config_column
+            else:
+                # Try case-insensitive match
+                for col in df.columns:
+                    if col.lower() == config_column.lower():
+                        actual_column = col
+                        print(f"Info: Found case-insensitive match: '{config_column}' -> '{actual_column}'")
+                        break
 
-                if actual_column:
-                    # Check for null/blank values before filtering
-                    null_count = df[actual_column].isnull().sum() + (df[actual_column] == '').sum() + (df[actual_column] == '.').sum()
+            if actual_column:
+                # Check for null/blank values before filtering
+                null_count = df[actual_column].isnull().sum() + (df[actual_column] == '').sum() + (df[actual_column] == '.').sum()
 
-                    print(f"Applying filter to {actual_column}: {filter_def['operator']} {filter_def['value']}")
-                    print(f"  Before filtering: {len(df)} total rows, {null_count} null/blank values")
+                print(f"Applying filter to {actual_column}: {filter_def['operator']} {filter_def['value']}")
+                print(f"  Before filtering: {len(df)} total rows, {null_count} null/blank values")
 
-                    # Show sample of the column data for debugging
-                    sample_values = df[actual_column].value_counts().head(10)
-                    print(f"  Sample values in {actual_column}: {dict(sample_values)}")
+                # Show sample of the column data for debugging
+                sample_values = df[actual_column].value_counts().head(10)
+                print(f"  Sample values in {actual_column}: {dict(sample_values)}")
 
-                    column_mask = self.apply_filter(df, actual_column, filter_def)
+                column_mask = self.apply_filter(df, actual_column, filter_def)
 
-                    # Debug: check what's in the mask
-                    print(f"  Filter mask: {column_mask.sum()} rows pass filter")
+                # Debug: check what's in the mask
+                print(f"  Filter mask: {column_mask.sum()} rows pass filter")
 
-                    mask = mask & column_mask
+                mask &= column_mask.to_numpy(dtype=bool, na_value=False)
 
-                    remaining_count = mask.sum()
-                    print(f"After filtering {actual_column} {filter_def['operator']} {filter_def['value']}: {remaining_count} rows remaining")
+                remaining_count = mask.sum()
+                print(f"After filtering {actual_column} {filter_def['operator']} {filter_def['value']}: {remaining_count} rows remaining")
 
-                    # Report null values being preserved for frequency columns
-                    if 'AF' in actual_column.upper() and null_count > 0:
-                        preserved_nulls = (mask & (df[actual_column].isnull() | (df[actual_column] == '') | (df[actual_column] == '.'))).sum()
-                        if preserved_nulls > 0:
-                            print(f"  ✓ Preserved {preserved_nulls} variants with missing frequency data")
-                        else:
-                            print(f"  ⚠️  WARNING: {null_count} null values existed but {preserved_nulls} were preserved!")
+                # Report null values being preserved for frequency columns
+                if 'AF' in actual_column.upper() and null_count > 0:
+                    preserved_nulls = (mask & (df[actual_column].isnull() | (df[actual_column] == '') | (df[actual_column] == '.')).to_numpy(dtype=bool, na_value=False)).sum()
+                    if preserved_nulls > 0:
+                        print(f"  ✓ Preserved {preserved_nulls} variants with missing frequency data")
+                    else:
+                        print(f"  ⚠️  WARNING: {null_count} null values existed but {preserved_nulls} were preserved!")
+            else:
+                print(f"Warning: Column '{config_column}' not found in data")
+
+        return mask
+
+    def create_filtered_pivoted_zarr(self, zarr_path: str, output_path: str = None, remove_validation_errors: bool = False) -> tuple[str, pd.DataFrame]:
+        """Create a filtered and pivoted Zarr file based on configuration criteria."""
+        print(f"Loading Zarr file: {zarr_path}")
+
+        # Load the Zarr file
+        ds = xr.open_zarr(zarr_path)
+
+        # Store original column order to preserve throughout processing
+        original_column_order = list(ds.dims) + list(ds.data_vars)
+
+        # Rows of the flattened table (as to_dataframe gives them), for flat and multi-dimensional stores
+        original_rows = int(np.prod(list(ds.sizes.values())))
+        print(f"BEFORE: Original data shape: ({original_rows}, {len(original_column_order)}) ({original_rows:,} rows)")
+
+        # STEP 0 + 1: Build the gene and column filter masks from only the columns they read,
+        # then load every column for the surviving rows in a single gather
+        filters = self.get_filters()
+        if len(ds.dims) == 1:
+            dim = next(iter(ds.dims))
+            selected = ds
+            if self.gene_filter_symbols is not None and "ANN['SYMBOL']" in ds.data_vars:
+                selected = self.select_gene_filtered_rows(ds)
+                self.report_gene_filter_results(original_rows, selected.sizes[dim])
+            elif self.gene_filter_symbols is not None:
+                print("Warning: ANN['SYMBOL'] column not found in data. Skipping gene filtering.")
+
+            if filters:
+                filter_columns = self.get_filter_columns(list(selected.data_vars), filters)
+                if filter_columns:
+                    filter_df = selected[filter_columns].to_dataframe().reset_index(drop=True)
                 else:
-                    print(f"Warning: Column '{config_column}' not found in data")
+                    # No filtered column is in the data: nothing to gather, every filter is
+                    # reported as missing and all rows pass
+                    filter_df = pd.DataFrame(index=pd.RangeIndex(selected.sizes[dim]))
+                mask = self.compute_filter_mask(filter_df, filters)
+                if not mask.all():
+                    selected = selected.isel({dim: np.flatnonzero(mask)})
+
+            df = dataset_to_dataframe(selected)
+        else:
+            df = self.load_gene_filtered_dataframe(ds)
+            if filters:
+                df = df[self.compute_filter_mask(df, filters)]
 
-            # Filter the dataframe
-            df = df[mask]
+        if filters:
             print(f"Filtered data shape: {df.shape}")
 
         # Drop specified columns (keep all others)
@@ -384,7 +491,7 @@ class ZarrFilterPivotCreator:
         df_clean = self.prepare_dataframe_for_xarray(df)
 
         # Convert to xarray
-        ds_processed = df_clean.to_xarray()
+        ds_processed = dataframe_to_dataset(df_clean)
 
         # Add metadata
         ds_processed.attrs['original_file'] = zarr_path
@@ -395,14 +502,15 @@ class ZarrFilterPivotCreator:
         ds_processed.attrs['filtered_rows'] = filtered_rows
         ds_processed.attrs['final_rows'] = final_rows
         ds_processed.attrs['processing_type'] = 'filtered_and_pivoted'
+        if 'sorted_by' in df.attrs:
+            ds_processed.attrs['sorted_by'] = df.attrs['sorted_by']
 
         # Add data type information
-        column_dtypes = {col: str(df_clean[col].dtype) for col in df_clean.columns}
-        ds_processed.attrs['column_dtypes'] = str(column_dtypes)
+        ds_processed.attrs['column_dtypes'] = json.dumps({col: str(dtype) for col, dtype in df_clean.dtypes.items()})
         ds_processed.attrs['aggregation_note'] = 'Single values preserve original type; multiple values converted to semicolon-separated strings'
 
-        # Save processed Zarr
-        ds_processed.to_zarr(output_path, mode='w')
+        # Save processed Zarr (explicit row chunks, Blosc/Zstd compression)
+        write_dataset_to_zarr(ds_processed, output_path)
         print(f"Filtered and pivoted Zarr saved to: {output_path}")
 
         return output_path, df
@@ -464,6 +572,45 @@ class ZarrFilterPivotCreator:
                 str_values = [str(val) for val in unique_values if str(val) not in ['nan', 'None']]
                 return ';'.join(str_values) if str_values else None
 
+    def aggregate_grouped_column(self, series: pd.Series, group_ids: np.ndarray, n_groups: int) -> pd.Series:
+        """
+        Aggregate one column for every group at once, with the same result as aggregate_column_values.
+
+        Instead of calling a Python function per group, the (group, value) pairs are de-duplicated
+        in one vectorized pass and counted per group with np.bincount. Only groups holding more
+        than one distinct value are joined into strings in Python.
+
+        Args:
+            series: Column to aggregate, aligned with group_ids
+            group_ids: Group number of each row (-1 for rows outside every group)
+            n_groups: Number of groups
+
+        Returns:
+            Series with one aggregated value per group, in group number order
+        """
+        valid = (group_ids >= 0) & series.notna().to_numpy()
+        pairs = pd.DataFrame({'group': group_ids[valid], 'value': series[valid].reset_index(drop=True)})
+        # drop_duplicates keeps first occurrences, so values stay in their unique() order
+        pairs = pairs.drop_duplicates()
+        pair_groups = pairs['group'].to_numpy()
+        pair_values = pairs['value'].to_numpy()
+        counts = np.bincount(pair_groups, minlength=n_groups)
+
+        result = np.full(n_groups, None, dtype=object)
+        single = counts[pair_groups] == 1
+        result[pair_groups[single]] = pair_values[single]
+
+        # Multiple different values - convert to string representation
+        # This prevents xarray mixed-type errors while preserving information
+        multi = pairs[~single]
+        if len(multi):
+            str_values = multi['value'].map(str)
+            str_values = str_values[~str_values.isin(['nan', 'None'])]
+            joined = str_values.groupby(multi['group'], sort=False).agg(';'.join)
+            result[joined.index.to_numpy()] = joined.to_numpy(dtype=object)
+
+        return pd.Series(result, dtype=object).infer_objects()
+
     def apply_pivot_operations(self, df: pd.DataFrame, filename: str, remove_validation_errors: bool = False) -> pd.DataFrame:
         """
         Apply pivot operations to convert long format to wide format.
@@ -496,7 +643,8 @@ class ZarrFilterPivotCreator:
 
         # Identify other columns (not in essential columns)
         all_columns = df.columns.tolist()
-        other_columns = [col for col in all_columns if col not in available_essential]
+        essential_set = set(available_essential)
+        other_columns = [col for col in all_columns if col not in essential_set]
 
         # Remove 'index' column if it exists (auto-generated by xarray/pandas conversion)
         if 'index' in other_columns:
@@ -514,17 +662,21 @@ class ZarrFilterPivotCreator:
             df['FILENAME'] = filename
             return df[column_order]
 
-        # Group by essential columns and aggregate others
-        grouped = df.groupby(available_essential)
-
-        # Prepare aggregation dictionary
-        agg_dict = {}
-        for col in other_columns:
-            agg_dict[col] = self.aggregate_column_values
+        # Group by essential columns and aggregate others. String keys (CHROM, REF, ALT, ...)
+        # are grouped as categoricals so the groupby hashes integer codes, not Python strings
+        string_keys = [col for col in available_essential if pd.api.types.is_string_dtype(df[col].dtype)]
+        group_df = df.assign(**{col: df[col].astype('category') for col in string_keys})
+        grouped = group_df.groupby(available_essential, observed=True)
 
         # Perform aggregation
         print("  Performing pivot aggregation...")
-        result_df = grouped.agg(agg_dict).reset_index()
+        # Rows with a missing key are outside every group (ngroup gives them NaN)
+        group_ids = grouped.ngroup().to_numpy(dtype=np.int64, na_value=-1)
+        result_df = grouped.size().index.to_frame(index=False)
+        for col in other_columns:
+            result_df[col] = self.aggregate_grouped_column(df[col], group_ids, len(result_df))
+        # Turn the categorical group keys back into plain columns of their values' dtype
+        result_df = result_df.astype({col: result_df[col].cat.categories.dtype for col in string_keys})
 
         # Add filename column
         result_df['FILENAME'] = filename
@@ -550,7 +702,12 @@ class ZarrFilterPivotCreator:
         genomic_coords = ['SAMPLE', 'CHROM', 'POS', 'REF', 'ALT']
         available_genomic_coords = [col for col in genomic_coords if col in result_df.columns]
 
-        if len(available_genomic_coords) >= 4:  # Need at least CHROM, POS, REF, ALT
+        if len(available_genomic_coords) >= 4 and set(available_essential) <= set(available_genomic_coords):
+            # Rows are unique on the group keys by construction; when every key is a genomic
+            # coordinate, no coordinate combination can repeat, so the groupby check is skipped
+            print(f"  ✅ VALIDATION PASSED: All {len(result_df)} genomic coordinate combinations are unique "
+                  f"(grouped by {available_essential})")
+        elif len(available_genomic_coords) >= 4:  # Need at least CHROM, POS, REF, ALT
             print(f"  Validating uniqueness for genomic coordinates: {available_genomic_coords}")
 
             # Group by genomic coordinates and count rows per group
@@ -563,44 +720,28 @@ class ZarrFilterPivotCreator:
                 if remove_validation_errors:
                     print("  🔧 REMOVING VALIDATION ERRORS: Extracting duplicate rows to separate file...")
 
-                    # Find all rows that are duplicates based on genomic coordinates
-                    duplicate_mask = pd.Series([False] * len(result_df))
-
-                    for coords in duplicate_groups.index:
-                        if isinstance(coords, tuple):
-                            # Multi-column grouping
-                            coord_dict = dict(zip(available_genomic_coords, coords))
-                            mask = pd.Series([True] * len(result_df))
-                            for col, val in coord_dict.items():
-                                mask = mask & (result_df[col] == val)
-                            duplicate_mask = duplicate_mask | mask
-                        else:
-                            # Single column grouping
-                            duplicate_mask = duplicate_mask | (result_df[available_genomic_coords[0]] == coords)
+                    # Find all rows that are duplicates based on genomic coordinates in one pass
+                    # (rows with missing coordinates are never grouped, so they never count as duplicates)
+                    duplicate_mask = (result_df.duplicated(subset=available_genomic_coords, keep=False)
+                                      & result_df[available_genomic_coords].notna().all(axis=1)).to_numpy()
 
                     # Extract duplicate coordinate combinations from pivoted data
-                    error_pivoted_rows = result_df[duplicate_mask].copy()
+                    error_pivoted_rows = result_df[duplicate_mask]
                     print(f"  Found {len(error_pivoted_rows)} pivoted rows with validation errors")
 
-                    # Find all original rows that contributed to these duplicate combinations
-                    original_error_rows = []
-                    for _, error_row in error_pivoted_rows.iterrows():
-                        # Create mask to find all original rows matching this genomic coordinate combination
-                        original_mask = pd.Series([True] * len(original_df))
-                        for coord_col in available_genomic_coords:
-                            if coord_col in original_df.columns:
-                                original_mask = original_mask & (original_df[coord_col] == error_row[coord_col])
-
-                        # Add matching original rows
-                        matching_original = original_df[original_mask]
-                        if len(matching_original) > 0:
-                            original_error_rows.append(matching_original)
+                    # Find all original rows that contributed to these duplicate combinations with
+                    # a single coordinate-tuple membership test instead of one scan per error row
+                    original_coords = [col for col in available_genomic_coords if col in original_df.columns]
+                    if original_coords:
+                        original_error_mask = pd.MultiIndex.from_frame(original_df[original_coords]).isin(
+                            pd.MultiIndex.from_frame(error_pivoted_rows[original_coords]))
+                    else:
+                        original_error_mask = np.full(len(original_df), len(error_pivoted_rows) > 0)
 
                     # Combine all original error rows
-                    if original_error_rows:
-                        combined_original_errors = pd.concat(original_error_rows, ignore_index=True)
-                        # Remove duplicates (in case same original row contributed to multiple validation errors)
-                        combined_original_errors = combined_original_errors.drop_duplicates()
+                    if original_error_mask.any():
+                        # Remove duplicates (in case identical original rows were recorded more than once)
+                        combined_original_errors = original_df[original_error_mask].drop_duplicates()
                         print(f"  Found {len(combined_original_errors)} original rows that caused validation errors")
                     else:
                         combined_original_errors = pd.DataFrame()
@@ -612,26 +753,17 @@ class ZarrFilterPivotCreator:
                     error_filename = logs_dir / f"validation_errors_{filename}.tsv"
                     print(f"  Saving original validation error rows to: {error_filename}")
 
-                    # Convert nullable types to standard types for TSV export
+                    # Save to TSV (nullable Int64/boolean missing values are written as '.')
                     if len(combined_original_errors) > 0:
-                        export_error_df = combined_original_errors.copy()
-                        for col in export_error_df.columns:
-                            if export_error_df[col].dtype.name in ['Int64', 'boolean']:
-                                if export_error_df[col].dtype.name == 'Int64':
-                                    export_error_df[col] = export_error_df[col].astype('float64')
-                                elif export_error_df[col].dtype.name == 'boolean':
-                                    export_error_df[col] = export_error_df[col].astype('object')
-
-                        # Save to TSV
-                        export_error_df.to_csv(error_filename, sep='\t', index=False, na_rep='.')
-                        print(f"  ✓ Saved {len(export_error_df)} original validation error rows to {error_filename}")
+                        write_tsv(combined_original_errors, error_filename)
+                        print(f"  ✓ Saved {len(combined_original_errors)} original validation error rows to {error_filename}")
                     else:
                         # Create empty file with headers if no errors found
-                        pd.DataFrame(columns=original_df.columns).to_csv(error_filename, sep='\t', index=False, na_rep='.')
+                        write_tsv(pd.DataFrame(columns=original_df.columns), error_filename)
                         print(f"  ✓ Created empty validation error file: {error_filename}")
 
                     # Remove duplicate rows from result_df (pivoted data)
-                    result_df = result_df[~duplicate_mask].copy()
+                    result_df = result_df[~duplicate_mask]
                     print(f"  ✓ Removed validation error rows. Continuing with {len(result_df)} clean rows")
 
                     # Re-validate the cleaned data
@@ -694,6 +826,10 @@ class ZarrFilterPivotCreator:
         else:
             print(f"  ⚠️  VALIDATION SKIPPED: Insufficient genomic coordinate columns found ({available_genomic_coords})")
 
+        # Record that rows are sorted by, and unique on, the group keys so later steps
+        # (zarr_groupby_aggregator.py) can rely on it instead of re-checking
+        result_df.attrs['sorted_by'] = list(available_essential)
+
         return result_df
 
     def prepare_dataframe_for_xarray(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -706,45 +842,31 @@ class ZarrFilterPivotCreator:
         Returns:
             DataFrame with consistent column data types, preserving original column order
         """
-        df_clean = df.copy()
-
-        # Store original column order
-        original_order = df_clean.columns.tolist()
-
-        for col in original_order:  # Process in original order
-            # Check if column has mixed types (object dtype with mixed content)
-            if df_clean[col].dtype == 'object':
-                # Check if all non-null values are of the same type
-                non_null_values = df_clean[col].dropna()
-                if len(non_null_values) > 0:
-                    # Get types of all non-null values
-                    value_types = [type(val) for val in non_null_values]
-                    unique_types = list(set(value_types))
-
-                    # If mixed types exist, convert all to string
-                    if len(unique_types) > 1:
-                        print(f"  Converting column '{col}' to string due to mixed types: {unique_types}")
-                        df_clean[col] = df_clean[col].astype(str)
-                        df_clean[col] = df_clean[col].replace('nan', None)
-                    else:
-                        # Try to infer and convert to appropriate type
-                        try:
-                            # Check if all values are numeric
-                            if all(isinstance(val, (int, float)) for val in non_null_values):
-                                if all(isinstance(val, int) for val in non_null_values):
-                                    df_clean[col] = df_clean[col].astype('Int64')  # Nullable integer
-                                else:
-                                    df_clean[col] = df_clean[col].astype('float64')
-                        except (ValueError, TypeError):
-                            # Keep as string if conversion fails
-                            df_clean[col] = df_clean[col].astype(str)
-                            df_clean[col] = df_clean[col].replace('nan', None)
-
-        # Ensure the DataFrame maintains the original column order
-        return df_clean[original_order]
+        # Classify object columns once with pandas' vectorized type inference
+        conversions = {}
+        for col in df.columns:
+            if df[col].dtype != 'object':
+                continue
+            kind = pd.api.types.infer_dtype(df[col], skipna=True)
+            if kind in ('string', 'empty', 'boolean'):
+                continue
+            if kind == 'integer':
+                conversions[col] = df[col].astype('Int64')  # Nullable integer
+            elif kind == 'floating':
+                conversions[col] = df[col].astype('float64')
+            elif kind.startswith('mixed'):
+                print(f"  Converting column '{col}' to string due to mixed types ({kind})")
+                conversions[col] = df[col].astype('string[pyarrow]')
+
+        # assign() keeps the original column order and only allocates the converted columns
+        if not conversions:
+            return df
+        return df.assign(**conversions)
 
 def main():
     """Main function."""
+    initialize_config()
+
     parser = argparse.ArgumentParser(description='Create filtered and pivoted Zarr files based on config.yaml criteria')
     parser.add_argument('--zarr', '-z', required=True, help='Input Zarr file path')
     parser.add_argument('--config', '-c', default='config.yaml', help='Configuration file (default: config.yaml)')
@@ -819,22 +941,12 @@ def main():
 
             print(f"Exporting processed data to TSV: {tsv_path}")
 
-            # Convert nullable types to standard types for TSV export
-            export_df = processed_df.copy()
-            for col in export_df.columns:
-                if export_df[col].dtype.name in ['Int64', 'boolean']:
-                    # Convert nullable types to standard types, replacing NaN with appropriate values
-                    if export_df[col].dtype.name == 'Int64':
-                        export_df[col] = export_df[col].astype('float64')  # Will show NaN for missing
-                    elif export_df[col].dtype.name == 'boolean':
-                        export_df[col] = export_df[col].astype('object')  # Will show None for missing
-
-            # Save to TSV
-            export_df.to_csv(tsv_path, sep='\t', index=False, na_rep='.')
+            # Save to TSV (nullable Int64/boolean missing values are written as '.')
+            write_tsv(processed_df, tsv_path)
             print(f"✓ Successfully exported TSV: {tsv_path}")
 
             # Report file sizes
-            zarr_size_mb = sum(f.stat().st_size for f in Path(output_path).rglob('*') if f.is_file()) / (1024 * 1024)
+            zarr_size_mb = get_directory_size(output_path) / (1024 * 1024)
             tsv_size_mb = Path(tsv_path).stat().st_size / (1024 * 1024)
             print("\n📁 FILE SIZES:")
             print(f"   Zarr file: {zarr_size_mb:.1f} MB")
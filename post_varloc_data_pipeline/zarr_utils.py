@@ -0,0 +1,523 @@
+"""
+Shared helpers for writing pipeline Zarr stores.
+
+Output stores are flat variant tables (one 1-D array per column), so every variable
+gets the same treatment: ~1 MB chunks along the row dimension and Blosc/Zstd compression.
+Stores are laid out the way xarray writes them (a shared 'index' dimension), so they
+can be read back with xr.open_zarr.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import dask
+import numcodecs
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import xarray as xr
+import zarr
+
+# Zarr-python 3 uses 'compressors' with zarr.codecs; 2.x uses a single numcodecs 'compressor'
+ZARR_V3 = int(zarr.__version__.split('.')[0]) >= 3
+
+# Object dtype that xarray writes as variable-length UTF-8 strings (used with Zarr 2)
+VLEN_STR = xr.coding.strings.create_vlen_dtype(str)
+
+# Target uncompressed bytes per chunk, with a floor on rows so narrow dtypes don't get tiny chunks
+TARGET_CHUNK_BYTES = 1_048_576
+MIN_CHUNK_ROWS = 65_536
+
+
+def get_compressor_encoding(clevel: int = 3, shuffle: bool = True) -> dict:
+    """
+    Return the encoding entry for Blosc/Zstd compression.
+
+    Args:
+        clevel: Zstd compression level
+        shuffle: Bit-shuffle the elements before compressing (see use_bitshuffle)
+
+    Returns:
+        Dict with the 'compressors' (Zarr 3) or 'compressor' (Zarr 2) encoding key
+    """
+    if ZARR_V3:
+        from zarr.codecs import BloscCodec
+        return {'compressors': (BloscCodec(cname='zstd', clevel=clevel,
+                                           shuffle='bitshuffle' if shuffle else 'noshuffle'),)}
+    return {'compressor': numcodecs.Blosc(cname='zstd', clevel=clevel,
+                                          shuffle=numcodecs.Blosc.BITSHUFFLE if shuffle else numcodecs.Blosc.NOSHUFFLE)}
+
+
+def zarr_threads(max_workers: int):
+    """
+    Return a context manager limiting the threads Zarr uses to encode an array's chunks.
+
+    Only Zarr 3 encodes chunks on a thread pool (set through zarr.config); Zarr 2 encodes
+    them one after another, so there is nothing to configure and a null context is returned.
+
+    Args:
+        max_workers: Maximum number of chunk-encoding threads
+    """
+    if ZARR_V3:
+        return zarr.config.set({'threading.max_workers': max_workers})
+    return nullcontext()
+
+
+def use_bitshuffle(dtype: np.dtype) -> bool:
+    """
+    Return whether a column of this dtype compresses better bit-shuffled.
+
+    Integer and boolean columns (positions, depths, counts, flags) have mostly-zero high
+    bits, which bit-shuffling groups together. Float columns such as allele frequencies
+    and QUAL repeat a limited set of values, and string chunks are a stream of bytes; both
+    compress 2-5x better unshuffled, where Zstd matches whole repeated values.
+
+    Args:
+        dtype: NumPy dtype of the column data
+
+    Returns:
+        True for integer and boolean dtypes
+    """
+    return dtype.kind in ('b', 'i', 'u')
+
+
+def is_vlen_string_dtype(dtype: np.dtype) -> bool:
+    """Return True for NumPy dtypes stored as variable-length strings (str, StringDType, object)."""
+    return dtype.kind in ('U', 'O', 'T')
+
+
+def get_chunk_rows(nrows: int, itemsize: int) -> int:
+    """
+    Pick the number of rows per chunk for a 1-D column.
+
+    Args:
+        nrows: Total number of rows in the column, or None when it is not known in advance
+        itemsize: Bytes per element (object columns count as pointer size)
+
+    Returns:
+        Rows per chunk, never more than nrows and never less than 1
+    """
+    chunk_rows = max(MIN_CHUNK_ROWS, TARGET_CHUNK_BYTES // max(itemsize, 1))
+    if nrows is None:
+        return chunk_rows
+    return max(1, min(nrows, chunk_rows))
+
+
+def build_zarr_encoding(ds) -> dict:
+    """
+    Build a per-variable to_zarr encoding with explicit chunks and Zstd compression.
+
+    Args:
+        ds: xarray Dataset of 1-D variables sharing a single row dimension
+
+    Returns:
+        Encoding dictionary suitable for ds.to_zarr(encoding=...)
+    """
+    encoding = {}
+    for name, var in ds.data_vars.items():
+        var_encoding = get_compressor_encoding(shuffle=use_bitshuffle(var.dtype))
+        if var.ndim == 1:
+            var_encoding['chunks'] = (get_chunk_rows(var.shape[0], var.dtype.itemsize),)
+        encoding[name] = var_encoding
+    # Coordinates (the row index) are compressed too, but keep xarray's chunking
+    for name, var in ds.coords.items():
+        encoding[name] = get_compressor_encoding(shuffle=use_bitshuffle(var.dtype))
+    return encoding
+
+
+def infer_object_kind(var) -> str:
+    """
+    Return the pandas infer_dtype kind of an object variable's values.
+
+    Dask-backed variables come from string arrays of an opened Zarr store and are
+    reported as 'string' without computing them.
+
+    Args:
+        var: xarray DataArray of dtype object
+
+    Returns:
+        'string', 'mixed', 'empty' (all missing), 'floating', ... as from infer_dtype
+    """
+    if var.chunks is not None:
+        return 'string'
+    return pd.api.types.infer_dtype(var.values.ravel(), skipna=True)
+
+
+def to_vlen_str(values: np.ndarray) -> np.ndarray:
+    """
+    Convert an object array to str values in an object array tagged as variable-length str.
+
+    Zarr 2 has no StringDType. xarray writes object variables with this tagged dtype using
+    Zarr 2's VLenUTF8 codec, without loading them first to infer what they hold.
+    """
+    return values.astype(str).astype(VLEN_STR)
+
+
+def write_dataset_to_zarr(ds, output_path, attrs: dict = None) -> None:
+    """
+    Write a (possibly lazy, Dask-backed) flat Dataset to Zarr with the standard encoding.
+
+    Each variable is rechunked to its target Zarr chunks first, so Dask writes whole
+    chunks in parallel and source encodings from open_zarr don't leak into the output.
+
+    Args:
+        ds: xarray Dataset of 1-D variables sharing a single row dimension
+        output_path: Output Zarr store path (overwritten)
+        attrs: Optional attributes replacing the Dataset's own attrs
+    """
+    ds = ds.drop_encoding()
+    encoding = build_zarr_encoding(ds)
+    for name in list(ds.data_vars):
+        var_encoding = encoding[name]
+        var = ds[name]
+        kind = infer_object_kind(var) if var.dtype == object else None
+        if kind in ('string', 'mixed'):
+            # Zarr strings load as object arrays; a lazy cast to a string dtype keeps xarray
+            # from computing the whole column up front just to infer the on-disk dtype.
+            # Missing values become '' (as xarray writes them), not the string 'nan'
+            var = var.where(var.notnull(), '')
+            if ZARR_V3:
+                var = var.astype(np.dtypes.StringDType())
+            elif var.chunks is not None:
+                var = var.copy(data=var.data.map_blocks(to_vlen_str, dtype=VLEN_STR))
+            else:
+                var = var.copy(data=to_vlen_str(var.values))
+        elif kind == 'empty':
+            # All-missing columns (e.g. a numeric field no row has) stay float64 NaN, as xarray encodes them
+            var = var.astype(np.float64)
+        if 'chunks' in var_encoding:
+            var = var.chunk(dict(zip(var.dims, var_encoding['chunks'])))
+        ds[name] = var
+    if attrs is not None:
+        ds.attrs = dict(attrs)
+    ds.to_zarr(str(output_path), mode='w', encoding=encoding, consolidated=True)
+
+
+def column_to_numpy(series: pd.Series) -> np.ndarray:
+    """
+    Convert a DataFrame column to a NumPy array Zarr can store.
+
+    Strings (and mixed/categorical columns) become str arrays with '' for missing values,
+    matching what xarray writes. Nullable Int64/boolean columns become float64 with NaN
+    when they hold missing values, and their plain NumPy dtype otherwise.
+
+    Args:
+        series: Column to convert
+
+    Returns:
+        1-D NumPy array
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Convert each category once and gather by code; code -1 (missing) picks the trailing ''
+        labels = np.array([str(category) for category in dtype.categories] + [''])
+        return labels[series.cat.codes.to_numpy()]
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        return series.astype(object).where(series.notna(), '').astype(str).to_numpy()
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        if series.hasnans:
+            return series.to_numpy(dtype='float64', na_value=np.nan)
+        return series.to_numpy(dtype=getattr(dtype, 'numpy_dtype', None))
+    return series.to_numpy()
+
+
+def group_codes(df: pd.DataFrame, columns) -> np.ndarray:
+    """
+    Number the distinct value combinations of columns, like groupby(columns).ngroup().
+
+    Each column is factorized once and the codes are folded together column by column,
+    so no tuple keys and no groupby are built. np.bincount on the valid codes gives the
+    row count of every combination. Codes are in order of first appearance, not sorted.
+
+    Args:
+        df: DataFrame holding the columns
+        columns: Columns whose value combinations are numbered
+
+    Returns:
+        int64 array with one code per row, -1 for rows with a missing value
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    valid = np.ones(len(df), dtype=bool)
+    for col in columns:
+        col_codes, uniques = pd.factorize(df[col])
+        valid &= col_codes >= 0
+        # Refactorize so the combined codes stay below the row count and cannot overflow
+        codes, _ = pd.factorize(codes * len(uniques) + col_codes)
+    result = np.full(len(df), -1, dtype=np.int64)
+    result[valid] = pd.factorize(codes[valid])[0]
+    return result
+
+
+def write_dataframe_to_zarr(df: pd.DataFrame, output_path, attrs: dict = None, dim: str = 'index') -> None:
+    """
+    Write a flat DataFrame to Zarr as one compressed 1-D array per column.
+
+    Skips building an xarray Dataset. An existing 'index' column (e.g. from reset_index)
+    is written as the dimension coordinate; otherwise the DataFrame index is used.
+
+    Args:
+        df: DataFrame to write
+        output_path: Output Zarr store path (overwritten)
+        attrs: Optional JSON-serializable attributes for the root group
+        dim: Name of the shared row dimension
+    """
+    columns = {name: df[name] for name in df.columns}
+    if dim not in columns:
+        columns = {dim: pd.Series(df.index.to_numpy(), index=df.index), **columns}
+
+    nrows = len(df)
+    root = zarr.open_group(str(output_path), mode='w')
+    with zarr_threads(os.cpu_count()):
+        for name, series in columns.items():
+            data = column_to_numpy(series)
+            array = create_column_array(root, name, data.dtype, nrows, nrows, dim)
+            if nrows:
+                array[:] = data
+
+    if attrs:
+        root.attrs.update(attrs)
+    zarr.consolidate_metadata(str(output_path))
+
+
+def create_column_array(root, name: str, dtype: np.dtype, nrows: int, total_rows: int = None, dim: str = 'index'):
+    """
+    Create one compressed 1-D column array in a Zarr group, laid out the way xarray reads it.
+
+    Args:
+        root: Zarr group to create the array in
+        name: Column name
+        dtype: NumPy dtype of the column data (str/object columns become variable-length strings)
+        nrows: Initial number of rows
+        total_rows: Expected final number of rows, used to size the chunks (None if unknown)
+        dim: Name of the shared row dimension
+
+    Returns:
+        The created Zarr array
+    """
+    is_str = is_vlen_string_dtype(dtype)
+    itemsize = np.dtype(object).itemsize if is_str else dtype.itemsize
+    chunks = (get_chunk_rows(total_rows, itemsize),)
+    if ZARR_V3:
+        return root.create_array(name, shape=(nrows,), dtype=str if is_str else dtype,
+                                 chunks=chunks, dimension_names=(dim,), **get_compressor_encoding(shuffle=use_bitshuffle(dtype)))
+    # Zarr 2 defaults to a fill value of 0, which xarray would read back as missing
+    array = root.create_dataset(name, shape=(nrows,), dtype=object if is_str else dtype,
+                                chunks=chunks, fill_value=None,
+                                object_codec=numcodecs.VLenUTF8() if is_str else None,
+                                **get_compressor_encoding(shuffle=use_bitshuffle(dtype)))
+    array.attrs['_ARRAY_DIMENSIONS'] = [dim]
+    return array
+
+
+class ZarrTableWriter:
+    """
+    Write a flat Zarr table batch by batch, one compressed 1-D array per column.
+
+    The arrays are created from the first batch (same layout as write_dataframe_to_zarr)
+    and every later batch is appended to them, so tables larger than memory can be written
+    from a stream of DataFrames. Later batches must have the same columns. A column whose
+    batches infer different numeric dtypes (e.g. int64 until the first missing value) is
+    promoted to their common dtype, and an all-missing numeric column that later holds
+    text becomes a string column, as if the whole table had been read at once. Works with
+    Zarr 2 and 3: create_column_array picks the array API and string codec for either.
+    """
+
+    def __init__(self, output_path, dim: str = 'index', max_workers: int = None):
+        """
+        Open the output store.
+
+        Args:
+            output_path: Output Zarr store path (overwritten)
+            dim: Name of the shared row dimension
+            max_workers: Threads compressing columns concurrently (default: one per CPU)
+        """
+        self.output_path = str(output_path)
+        self.dim = dim
+        self.root = zarr.open_group(self.output_path, mode='w')
+        self.arrays = None
+        self.nrows = 0
+        self.max_workers = max_workers or os.cpu_count()
+        # One pool for every batch, started by the first append and shut down by close() or abort()
+        self.pool = None
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Append the rows of a DataFrame to the table.
+
+        Args:
+            df: Batch to write; the row dimension is numbered on from the previous batch
+        """
+        columns = {self.dim: np.arange(self.nrows, self.nrows + len(df), dtype=np.int64)}
+        columns.update((name, column_to_numpy(df[name])) for name in df.columns)
+
+        if self.arrays is None:
+            self.arrays = {name: create_column_array(self.root, name, data.dtype, 0, None, self.dim)
+                           for name, data in columns.items()}
+        elif list(columns) != list(self.arrays):
+            raise ValueError(f"Batch columns differ from the first batch written to {self.output_path}")
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        # Columns are separate arrays, so they are compressed and written concurrently;
+        # Blosc releases the GIL, and a batch often fills only one chunk per column. The
+        # pool is the only parallelism: zarr encodes each column's chunks on one thread
+        with zarr_threads(1):
+            list(self.pool.map(lambda name: self.append_column(name, columns[name], df), columns))
+        self.nrows += len(df)
+
+    def abort(self) -> None:
+        """
+        Stop writing after a failed batch.
+
+        The incomplete store is left in place: it has no final attributes yet, and the next
+        writer opened on the same path overwrites it.
+        """
+        self.shutdown_pool()
+
+    def shutdown_pool(self) -> None:
+        """Shut down the column-write pool, if a batch has started it."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def append_column(self, name: str, data: np.ndarray, df: pd.DataFrame) -> None:
+        """
+        Append one column of a batch, promoting the stored array first if needed.
+
+        Args:
+            name: Column name
+            data: Column values converted by column_to_numpy
+            df: Batch the column comes from
+        """
+        array = self.arrays[name]
+        if is_vlen_string_dtype(array.dtype):
+            if not is_vlen_string_dtype(data.dtype):
+                # e.g. an all-missing float batch: written as '' like other missing strings
+                data = column_to_numpy(df[name].astype(object))
+        elif is_vlen_string_dtype(data.dtype):
+            array = self.promote_column(name, data.dtype)
+        elif data.dtype != array.dtype:
+            dtype = np.result_type(array.dtype, data.dtype)
+            if dtype != array.dtype:
+                array = self.promote_column(name, dtype)
+            data = data.astype(dtype)
+        array.append(data)
+
+    def promote_column(self, name: str, dtype: np.dtype):
+        """
+        Rewrite an already written column with a wider dtype.
+
+        Args:
+            name: Column name
+            dtype: New dtype; a string dtype is only allowed if every value so far is missing
+
+        Returns:
+            The new Zarr array holding the existing rows
+        """
+        values = self.arrays[name][:]
+        if is_vlen_string_dtype(dtype):
+            if not (values.dtype.kind == 'f' and np.isnan(values).all()):
+                raise ValueError(f"Column '{name}' holds {values.dtype} values before row {self.nrows:,} "
+                                 f"and strings after it")
+            values = np.full(len(values), '', dtype=str)
+        else:
+            values = values.astype(dtype)
+        del self.root[name]
+        array = create_column_array(self.root, name, values.dtype, 0, None, self.dim)
+        array.append(values)
+        self.arrays[name] = array
+        return array
+
+    def close(self, attrs: dict = None) -> None:
+        """
+        Write the root attributes and consolidate the store metadata.
+
+        Args:
+            attrs: Optional JSON-serializable attributes for the root group
+        """
+        self.shutdown_pool()
+        if attrs:
+            self.root.attrs.update(attrs)
+        zarr.consolidate_metadata(self.output_path)
+
+
+def dataset_to_dataframe(ds) -> pd.DataFrame:
+    """
+    Load a flat (possibly Dask-backed) Dataset into a DataFrame.
+
+    Equivalent to ds.to_dataframe().reset_index(), but every variable is computed in one
+    dask.compute call, so chunks of all columns are decoded in parallel rather than one
+    column at a time. String variables become Arrow-backed string columns instead of
+    object columns holding one Python str per cell.
+
+    Args:
+        ds: xarray Dataset of 1-D variables sharing a single row dimension
+
+    Returns:
+        DataFrame with the row dimension as its first column
+    """
+    if len(ds.dims) != 1:
+        return ds.to_dataframe().reset_index()
+
+    dim = next(iter(ds.dims))
+    columns = [name for name in ds.variables if name not in ds.dims]
+    values = dask.compute(*[ds[name].data for name in columns])
+
+    index = ds.indexes[dim] if dim in ds.indexes else pd.RangeIndex(ds.sizes[dim])
+    data = {dim: index.to_numpy()}
+    for name, array in zip(columns, values):
+        if array.dtype.kind in ('T', 'U'):
+            array = pa.array(array).to_pandas()
+        data[name] = array
+    return pd.DataFrame(data)
+
+
+def dataframe_to_dataset(df: pd.DataFrame) -> xr.Dataset:
+    """
+    Build a flat Dataset from a DataFrame, one 1-D variable per column.
+
+    Same result as df.to_xarray() for a single (non-Multi) index, but each column's NumPy
+    array is handed to xarray directly instead of going through xarray's generic
+    DataFrame conversion, which unstacks along the index and copies every column.
+
+    Args:
+        df: DataFrame to convert; its index becomes the row coordinate
+
+    Returns:
+        Dataset with the index name (default 'index') as its row dimension
+    """
+    if isinstance(df.index, pd.MultiIndex):
+        return df.to_xarray()
+
+    dim = df.index.name if df.index.name is not None else 'index'
+    # As in to_xarray, a column named like the index (e.g. a kept 'index' column) becomes the coordinate
+    coordinate = df[dim] if dim in df.columns else df.index
+    return xr.Dataset({name: (dim, df[name].to_numpy()) for name in df.columns if name != dim},
+                      coords={dim: coordinate.to_numpy()})
+
+
+def get_directory_size(path) -> int:
+    """
+    Return the total size in bytes of the files under a directory (e.g. a Zarr store).
+
+    Walks the tree with os.scandir, reusing each DirEntry's cached type and stat
+    information instead of building Path objects and stat-ing every entry repeatedly.
+    Symlinks are not followed.
+
+    Args:
+        path: Directory to measure
+
+    Returns:
+        Total size of all regular files, in bytes
+    """
+    total = 0
+    stack = [str(path)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
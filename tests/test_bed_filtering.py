@@ -250,6 +250,101 @@ def test_bed_filtering():
                     path.unlink()
                     print(f"Removed file: {path}")
 
+def test_bed_overlap_nested_and_unsorted_regions(tmp_path):
+    """Overlapping, nested, and unsorted BED regions are matched with inclusive bounds."""
+    bed_file = tmp_path / 'nested.bed'
+    # chr1: wide region 100-1000 wraps a short 200-300 region; listed out of order
+    bed_file.write_text("chr1\t200\t300\nchr1\t100\t1000\nCHR2\t50\t60\n")
+
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text("ADDITIONAL_ZARR_FILTERING:\n  DROP_COLUMNS: []\n")
+
+    filter_processor = AdditionalZarrFilter(str(config_file))
+    filter_processor.load_bed_file(str(bed_file))
+
+    df = pd.DataFrame({
+        'CHROM': ['1', 'chr1', '1', '1', '2', '2', 'X', '1'],
+        'POS': [99, 100, 500, 1001, 50, 61, 150, 'bad'],
+    })
+    mask = filter_processor.compute_bed_mask(df)
+
+    assert mask.tolist() == [False, True, True, False, True, False, False, False]
+
+
+def test_load_gzipped_bed_without_extension(tmp_path):
+    """Gzipped BED files are detected from their content, not the file name."""
+    import gzip
+
+    bed_file = tmp_path / 'regions.bed'
+    with gzip.open(bed_file, 'wt') as f:
+        f.write("chr1\t100\t200\tname\nchrX\t5\t10\tother\n")
+
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text("ADDITIONAL_ZARR_FILTERING:\n  DROP_COLUMNS: []\n")
+
+    filter_processor = AdditionalZarrFilter(str(config_file))
+    filter_processor.load_bed_file(str(bed_file))
+
+    assert filter_processor.bed_chrom.tolist() == ['1', 'x']
+    assert filter_processor.bed_start.tolist() == [100, 5]
+    assert filter_processor.bed_end.tolist() == [200, 10]
+
+
+def test_filter_dataset_without_filter_columns(tmp_path):
+    """A store with none of the filter columns is returned unfiltered."""
+    (tmp_path / 'regions.bed').write_text("chr1\t100\t200\n")
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text("ADDITIONAL_ZARR_FILTERING:\n  DROP_COLUMNS: []\n")
+
+    filter_processor = AdditionalZarrFilter(str(config_file))
+    filter_processor.load_bed_file(str(tmp_path / 'regions.bed'))
+
+    ds = pd.DataFrame({'REF': ['A', 'G'], 'ALT': ['T', 'C']}).to_xarray()
+    assert filter_processor.filter_dataset(ds) is ds
+
+
+def test_cli_script_filters_flat_zarr(tmp_path):
+    """The filter runs as a script (as the Makefile calls it) on a flat Zarr store with a BED filter."""
+    import subprocess
+
+    df = pd.DataFrame({
+        'CHROM': ['1', '1', '2', '4'],
+        'POS': [150, 250, 1050, 3000],
+        'ID': ['rs1', 'rs2', 'rs3', 'rs4'],
+        "ANN['SYMBOL']": ['GENE1', 'GENE2', 'GENE3', 'GENE4'],
+    })
+    df.to_xarray().to_zarr(str(tmp_path / 'input.zarr'), mode='w')
+    (tmp_path / 'regions.bed').write_text("chr1\t100\t200\nchr2\t1000\t1100\n")
+    (tmp_path / 'config.yaml').write_text("ADDITIONAL_ZARR_FILTERING:\n  OUTPUT_DIR: output\n"
+                                          "  BED_FILE: regions.bed\n  DROP_COLUMNS: []\n")
+
+    script = Path(__file__).parents[1] / 'post_varloc_data_pipeline' / 'additional_zarr_filtering.py'
+    result = subprocess.run([sys.executable, str(script), '--input', 'input.zarr', '--config', 'config.yaml',
+                             '--export-tsv', '--quiet'],
+                            cwd=tmp_path, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    filtered = pd.read_csv(tmp_path / 'output' / 'input_add_filter.tsv', sep='\t')
+    assert list(zip(filtered['CHROM'], filtered['POS'])) == [(1, 150), (2, 1050)]
+
+
 if __name__ == "__main__":
     success = test_bed_filtering()
     sys.exit(0 if success else 1)
+
+
+def test_multi_dimensional_store_counts_flattened_rows(tmp_path):
+    """Original and filtered row counts of a non-flat store both count the flattened table rows."""
+    import numpy as np
+
+    ds = xr.Dataset({'DP': (('index', 'sample'), np.arange(12).reshape(4, 3))},
+                    coords={'index': np.arange(4), 'sample': ['a', 'b', 'c']})
+    ds.to_zarr(str(tmp_path / 'input.zarr'), mode='w')
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text(f"ADDITIONAL_ZARR_FILTERING:\n  OUTPUT_DIR: {tmp_path / 'output'}\n  DROP_COLUMNS: []\n")
+
+    output_path, filtered_df = AdditionalZarrFilter(str(config_file)).process_zarr_file(str(tmp_path / 'input.zarr'))
+
+    attrs = xr.open_zarr(output_path).attrs
+    assert len(filtered_df) == 12
+    assert attrs['original_rows'] == attrs['filtered_rows'] == 12
@@ -0,0 +1,26 @@
+"""Tests for the shared TSV export helper."""
+
+import numpy as np
+import pandas as pd
+
+from post_varloc_data_pipeline.tsv_utils import write_tsv
+
+
+def test_write_tsv_matches_to_csv(tmp_path):
+    """The Arrow writer produces the same bytes as pandas.to_csv, including bools and floats."""
+    df = pd.DataFrame({
+        'CHROM': ['1', '2', None, 'X'],
+        'POS': [100, 200, 300, 400],
+        'AF': [1.0, 1e-05, np.nan, 0.25],
+        'PASS': [True, False, True, False],
+        'FLAG': pd.array([True, None, False, True], dtype='boolean'),
+        'DP': pd.array([10, None, 30, 40], dtype='Int64'),
+        'QUAL': np.array([0.1, 2.5, 1e20, np.nan], dtype=np.float32),
+    })
+    expected = tmp_path / 'expected.tsv'
+    df.to_csv(expected, sep='\t', index=False, na_rep='.')
+
+    written = tmp_path / 'written.tsv'
+    write_tsv(df, written)
+
+    assert written.read_bytes() == expected.read_bytes()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched TSV conversion in vembrane_tsv_to_zarr.py
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import xarray as xr
+
+sys.path.insert(0, str(Path(__file__).parent))
+from post_varloc_data_pipeline import vembrane_tsv_to_zarr
+from post_varloc_data_pipeline.vembrane_tsv_to_zarr import coerce_dtype_columns
+
+
+def test_coerce_dtype_columns_keeps_unconvertible_column_as_object():
+    """A cell that cannot be converted (inf in an int64 column) keeps that column as object."""
+    df = pd.DataFrame({"INFO['DP']": ['3', 'inf', '.'], 'POS': ['5', '.', '7']})
+
+    converted = coerce_dtype_columns(df, {"INFO['DP']": 'int64', 'POS': 'int64'})
+
+    assert converted["INFO['DP']"].dtype == object
+    assert converted["INFO['DP']"].tolist() == ['3', 'inf', '.']
+    assert converted['POS'].tolist() == [5, 0, 7]
+
+
+def test_coerce_dtype_columns_keeps_missing_strings_missing():
+    """String columns keep missing cells missing, from either reader, instead of the text 'nan'/'None'."""
+    df = pd.DataFrame({"ANN['SYMBOL']": pd.Series(['A', None], dtype=object),
+                       'ID': pd.Series([float('nan'), 5.0])})
+
+    converted = coerce_dtype_columns(df, {"ANN['SYMBOL']": 'string', 'ID': 'string'})
+
+    assert "ANN['SYMBOL']" not in converted
+    assert converted['ID'].isna().tolist() == [True, False]
+    assert converted['ID'][1] == '5.0'
+
+
+def write_sparse_tsv(path, nrows=400):
+    """Write a TSV whose ANN['X'] column is empty for the first half of the rows and text after."""
+    lines = ["CHROM\tPOS\tANN['X']\tANN['Y']"]
+    for i in range(nrows):
+        lines.append(f"{1 + i * 2 // nrows}\t{i}\t{f'GENE{i}' if i >= nrows // 2 else ''}\t{i * 0.5}")
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+
+def conversion_args(tsv_path, output_format='zarr', **overrides):
+    """Namespace with the command line defaults of vembrane_tsv_to_zarr.py."""
+    args = dict(output=str(tsv_path.parent), rename_map=None, dtype_file=None, skip_dtypes=True,
+                chunk_rows=100, format=output_format, force=True)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_iter_arrow_tsv_chunks_matches_read_csv(tmp_path, monkeypatch):
+    """Arrow batches hold at least chunk_rows rows and equal the C parser's values and types."""
+    tsv_path = tmp_path / 'fam.sample.tsv'
+    tsv_path.write_text("CHROM\tPOS\tQUAL\tID\n" + ''.join(f"{i % 3 + 1}\t{i}\t{i / 4}\trs{i}\n" for i in range(250)))
+    monkeypatch.setattr(vembrane_tsv_to_zarr, 'ARROW_BLOCK_SIZE', 1024)
+
+    batches = list(vembrane_tsv_to_zarr.iter_arrow_tsv_chunks(str(tsv_path), 100, ['ID']))
+    expected = pd.concat(vembrane_tsv_to_zarr.iter_tsv_chunks(str(tsv_path), 100, ['ID']), ignore_index=True)
+    result = pd.concat(batches, ignore_index=True)
+
+    assert len(batches) > 1 and all(len(batch) >= 100 for batch in batches[:-1])
+    assert isinstance(result['CHROM'].dtype, pd.CategoricalDtype)
+    assert result.astype({'CHROM': str}).equals(expected.astype({'CHROM': str}))
+
+
+def test_sparse_column_falls_back_to_c_parser(tmp_path, monkeypatch):
+    """Text after an empty first Arrow block makes the conversion redo the file with the C parser."""
+    tsv_path = write_sparse_tsv(tmp_path / 'fam.sample.tsv')
+    monkeypatch.setattr(vembrane_tsv_to_zarr, 'ARROW_BLOCK_SIZE', 1024)
+    with pytest.raises(pa.ArrowInvalid):
+        list(vembrane_tsv_to_zarr.iter_arrow_tsv_chunks(str(tsv_path), 100))
+
+    vembrane_tsv_to_zarr.process_one(str(tsv_path), conversion_args(tsv_path))
+
+    ds = xr.open_zarr(str(tmp_path / 'fam.sample.zarr'))
+    assert ds.attrs['final_shape'] == [400, 6]
+    assert ds["ANN['X']"].values[[0, 399]].tolist() == ['', 'GENE399']
+    assert ds["ANN['Y']"].values[399] == 199.5
+
+
+def test_parquet_output_with_sparse_column(tmp_path, monkeypatch):
+    """Parquet output types a column empty in the first batch as strings, and leaves no partial file."""
+    tsv_path = write_sparse_tsv(tmp_path / 'fam.sample.tsv')
+    monkeypatch.setattr(vembrane_tsv_to_zarr, 'ARROW_BLOCK_SIZE', 1024)
+
+    vembrane_tsv_to_zarr.process_one(str(tsv_path), conversion_args(tsv_path, 'parquet'))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['fam.sample.parquet', 'fam.sample.tsv']
+    df = pd.read_parquet(tmp_path / 'fam.sample.parquet')
+    assert len(df) == 400
+    assert df["ANN['X']"].isna()[:200].all() and df["ANN['X']"][399] == 'GENE399'
+    assert df['family'].unique().tolist() == ['fam']
+    metadata = pq.read_metadata(tmp_path / 'fam.sample.parquet').metadata
+    assert json.loads(metadata[b'final_shape']) == [400, 6]
+
+
+def test_parquet_writer_removes_partial_file_on_type_mismatch(tmp_path):
+    """A batch that does not fit the first batch's types raises ValueError and removes the partial file."""
+    writer = vembrane_tsv_to_zarr.ParquetTableWriter(str(tmp_path / 'out.parquet'))
+    writer.append(pd.DataFrame({'POS': [1, 2]}))
+
+    with pytest.raises(ValueError, match='does not match'):
+        writer.append(pd.DataFrame({'POS': ['text', '3']}))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_zarr_writer_starts_column_pool_on_first_append(tmp_path):
+    """The writer holds no threads until a batch is written, and close() releases them."""
+    writer = vembrane_tsv_to_zarr.ZarrTableWriter(str(tmp_path / 'out.zarr'))
+    assert writer.pool is None
+
+    writer.append(pd.DataFrame({'POS': [1, 2], 'ID': ['rs1', None]}))
+    assert writer.pool is not None
+    writer.close()
+    assert writer.pool is None
+
+    ds = xr.open_zarr(str(tmp_path / 'out.zarr'))
+    assert ds['POS'].values.tolist() == [1, 2]
+    assert ds['ID'].values.tolist() == ['rs1', '']
+
+
+def test_zarr_writer_promotes_columns_across_batches(tmp_path):
+    """Integer columns that later hold NaN become float64, and all-missing ones that later hold text become strings."""
+    writer = vembrane_tsv_to_zarr.ZarrTableWriter(str(tmp_path / 'out.zarr'))
+    writer.append(pd.DataFrame({'DP': [1, 2], "ANN['X']": [float('nan')] * 2,
+                                'CHROM': pd.Categorical(['1', '2'])}))
+    writer.append(pd.DataFrame({'DP': [float('nan'), 3.5], "ANN['X']": ['GENE1', None],
+                                'CHROM': pd.Categorical(['X', None])}))
+    writer.close(attrs={'final_shape': [4, 3]})
+
+    ds = xr.open_zarr(str(tmp_path / 'out.zarr'))
+    assert ds['index'].values.tolist() == [0, 1, 2, 3]
+    assert ds['DP'].values[[0, 1, 3]].tolist() == [1.0, 2.0, 3.5]
+    assert ds["ANN['X']"].values.tolist() == ['', '', 'GENE1', '']
+    assert ds['CHROM'].values.tolist() == ['1', '2', 'X', '']
+    assert ds.attrs['final_shape'] == [4, 3]
+
+
+def test_is_output_up_to_date(tmp_path):
+    """Outputs count as current only when complete and newer than every source file."""
+    tsv_path = write_sparse_tsv(tmp_path / 'fam.sample.tsv', nrows=10)
+    zarr_path = tmp_path / 'fam.sample.zarr'
+    assert not vembrane_tsv_to_zarr.is_output_up_to_date(str(zarr_path), [str(tsv_path)])
+
+    # An interrupted store has no final_shape attribute yet
+    writer = vembrane_tsv_to_zarr.ZarrTableWriter(str(zarr_path))
+    writer.append(pd.DataFrame({'POS': [1]}))
+    writer.abort()
+    assert not vembrane_tsv_to_zarr.is_output_up_to_date(str(zarr_path), [str(tsv_path)])
+
+    vembrane_tsv_to_zarr.process_one(str(tsv_path), conversion_args(tsv_path))
+    assert vembrane_tsv_to_zarr.is_output_up_to_date(str(zarr_path), [str(tsv_path)])
+
+    # Root metadata of a Zarr 3 store, or the consolidated metadata of a Zarr 2 store
+    metadata = zarr_path / 'zarr.json' if (zarr_path / 'zarr.json').exists() else zarr_path / '.zmetadata'
+    later = metadata.stat().st_mtime + 10
+    os.utime(tsv_path, (later, later))
+    assert not vembrane_tsv_to_zarr.is_output_up_to_date(str(zarr_path), [str(tsv_path)])
+
+
+def test_cli_converts_several_inputs_in_parallel(tmp_path):
+    """--inputs with --jobs converts every file, each into its own store."""
+    inputs = [write_sparse_tsv(tmp_path / f'fam{k}.sample.tsv', nrows=20) for k in range(3)]
+    script = Path(__file__).parents[1] / 'post_varloc_data_pipeline' / 'vembrane_tsv_to_zarr.py'
+
+    result = subprocess.run([sys.executable, str(script), '--inputs', *map(str, inputs), '--jobs', '2',
+                             '--skip_dtypes', '--output', str(tmp_path / 'out')],
+                            capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    for k in range(3):
+        ds = xr.open_zarr(str(tmp_path / 'out' / f'fam{k}.sample.zarr'))
+        assert ds.sizes['index'] == 20
+        assert set(ds['family'].values) == {f'fam{k}'}